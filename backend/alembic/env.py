@@ -16,6 +16,7 @@ from app.db.base import Base
 import app.models.user
 import app.models.company
 import app.models.email
+import app.models.target_profile
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,46 @@
+"""add target profiles
+
+Revision ID: 3f2a9c1d7b84
+Revises: 651983e5529d
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f2a9c1d7b84'
+down_revision: Union[str, None] = '651983e5529d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'target_profiles',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('domain', sa.String(), nullable=True),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('business_areas', sa.JSON(), nullable=True),
+        sa.Column('contact_url', sa.String(), nullable=True),
+        sa.Column('contact_info', sa.JSON(), nullable=True),
+        sa.Column('scraped_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('contact_scraped_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_target_profiles_id'), 'target_profiles', ['id'], unique=False)
+    op.create_index(op.f('ix_target_profiles_domain'), 'target_profiles', ['domain'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_target_profiles_domain'), table_name='target_profiles')
+    op.drop_index(op.f('ix_target_profiles_id'), table_name='target_profiles')
+    op.drop_table('target_profiles')
@@ -0,0 +1,32 @@
+"""track target profile requests
+
+Revision ID: 8c41e2b6d5fa
+Revises: 3f2a9c1d7b84
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c41e2b6d5fa'
+down_revision: Union[str, None] = '3f2a9c1d7b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('target_profiles', sa.Column('url', sa.String(), nullable=True))
+    op.add_column('target_profiles', sa.Column('request_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('target_profiles', sa.Column('last_requested_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('target_profiles', 'last_requested_at')
+    op.drop_column('target_profiles', 'request_count')
+    op.drop_column('target_profiles', 'url')
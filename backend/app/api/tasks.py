@@ -1,17 +1,41 @@
 # app/api/tasks.py
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from app.db.session import get_db
+from app.config import settings
 from app.models.user import User
-from app.utils.security import get_current_user
-from app.utils.task_queue import add_task, get_task_status
+from app.schemas.task import TaskStatusQuery
+from app.utils.security import get_current_user, get_current_active_admin, get_current_user_from_query
+from app.utils.task_queue import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    add_batch,
+    cancel_tasks,
+    check_admission,
+    estimate_queue_wait,
+    get_batch,
+    get_batch_task_ids,
+    get_changed_tasks,
+    get_task_statuses,
+    get_task_store_stats,
+    list_batches,
+    unknown_task_status,
+)
+from app.utils.task_backend import FINISHED_STATES
 from app.utils.llm_agent import generate_email_with_agent
+from app.utils.web_scraper import normalize_url
+from app.utils.http_client import http_cache
 import app.crud.company as crud_company
 import app.crud.email as crud_email
+import asyncio
+import hashlib
 import json
 import logging
+import time
 
 
 router = APIRouter()
@@ -23,6 +47,15 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def _generation_dedup_key(company_id: int, url: str, kwargs: Dict[str, Any]) -> str:
+    """
+    Identify generation requests that would produce the same email: same
+    company (and company details), normalized URL and generation options.
+    """
+    options = {name: value for name, value in kwargs.items() if name != "target_url"}
+    key = json.dumps([company_id, normalize_url(url), options], sort_keys=True, default=str)
+    return hashlib.sha256(key.encode()).hexdigest()
+
 
 @router.post("/generate-emails", response_model=Dict[str, Any])
 async def create_email_generation_tasks(
@@ -76,34 +109,123 @@ async def create_email_generation_tasks(
     
     logger.info(f"Creating tasks for URLs: {target_urls}")
     
-    # Create tasks for each URL
-    task_ids = []
+    # Small requests jump ahead of bulk batches so a user waiting on a single
+    # email is not stuck behind someone else's long run
+    if len(target_urls) <= settings.TASK_INTERACTIVE_MAX_URLS:
+        priority = PRIORITY_INTERACTIVE
+    else:
+        priority = PRIORITY_BULK
+    
+    # Shed load instead of building a queue nobody will wait for
+    admission = await run_in_threadpool(check_admission, len(target_urls), priority)
+    if not admission["admitted"]:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=(
+                f"The email generation queue is full, please retry in "
+                f"{admission['retry_after']} seconds"
+            ),
+            headers={"Retry-After": str(admission["retry_after"])}
+        )
+    
+    # Queue one task per URL as a single batch that can be tracked as a unit;
+    # the worker pool awaits the coroutine and supplies the task_id argument.
+    # Resubmitting a URL that is still being processed joins the existing task
+    items = []
     for url in target_urls:
-        try:
-            # Create synchronous task that will call the async function
-            def task_wrapper():
-                import asyncio
-                logger.info(f"Starting task for URL: {url}")
-                result = asyncio.run(generate_email_with_agent(
-                    task_id=task_id,  # Will be defined below
-                    company_data=company_data,
-                    target_url=url,
-                    find_contact=data.get("find_contact", False),
-                    tone=data.get("tone", "professional"),
-                    personalization_level=data.get("personalization_level", "medium"),
-                    custom_instructions=data.get("custom_instructions")
-                ))
-                logger.info(f"Task completed for URL: {url}")
-                return result
-            
-            # Add the task to the queue
-            task_id = add_task(task_wrapper)
-            task_ids.append({"url": url, "task_id": task_id})
-            logger.info(f"Task created with ID: {task_id} for URL: {url}")
-        except Exception as e:
-            logger.error(f"Error creating task for URL {url}: {str(e)}")
+        kwargs = {
+            "company_data": company_data,
+            "target_url": url,
+            "find_contact": data.get("find_contact", False),
+            "tone": data.get("tone", "professional"),
+            "personalization_level": data.get("personalization_level", "medium"),
+            "custom_instructions": data.get("custom_instructions")
+        }
+        items.append({
+            "url": url,
+            "kwargs": kwargs,
+            "dedup_key": _generation_dedup_key(company.id, url, kwargs)
+        })
+    
+    try:
+        batch = await run_in_threadpool(
+            add_batch,
+            generate_email_with_agent,
+            items,
+            owner_id=current_user.id,
+            metadata={"company_id": company.id},
+            priority=priority
+        )
+    except Exception as e:
+        logger.error(f"Error creating email generation batch: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to queue email generation tasks"
+        )
+    
+    logger.info(f"Batch created with ID: {batch['batch_id']} ({len(batch['tasks'])} tasks)")
+    batch["estimated_wait_seconds"] = round(admission["estimated_wait_seconds"])
+    return batch
+
+@router.get("/batches", response_model=List[Dict[str, Any]])
+async def list_batches_endpoint(
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    List the current user's most recent batches with counts by state and
+    aggregate progress.
+    """
+    return await run_in_threadpool(list_batches, current_user.id, limit)
+
+@router.get("/batches/{batch_id}", response_model=Dict[str, Any])
+async def get_batch_endpoint(
+    batch_id: str,
+    include_results: bool = False,
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Get a batch with counts by state, aggregate progress and the status of
+    every URL. Pass ``include_results`` to also return the generated emails.
+    """
+    batch = await run_in_threadpool(get_batch, batch_id, include_results)
+    if not batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Batch not found"
+        )
+    
+    if batch["owner_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
     
-    return {"tasks": task_ids}
+    return batch
+
+@router.post("/batches/{batch_id}/cancel", response_model=Dict[str, Any])
+async def cancel_batch_endpoint(
+    batch_id: str,
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Cancel every unfinished task of a batch.
+    """
+    batch = await run_in_threadpool(get_batch, batch_id)
+    if not batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Batch not found"
+        )
+    
+    if batch["owner_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    task_ids = [item["task_id"] for item in batch["tasks"] if item["status"] not in FINISHED_STATES]
+    return await run_in_threadpool(cancel_tasks, task_ids, current_user.id)
 
 @router.get("/status/{task_id}", response_model=Dict[str, Any])
 async def get_task_status_endpoint(
@@ -111,10 +233,169 @@ async def get_task_status_endpoint(
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
-    Get the status of a task.
+    Get the status of a task. Tasks of other users are reported as unknown.
     """
-    status = get_task_status(task_id)
-    return status
+    statuses = await run_in_threadpool(get_task_statuses, [task_id], 0, current_user.id)
+    return statuses.get(task_id, unknown_task_status())
+
+@router.post("/cancel/{task_id}", response_model=Dict[str, Any])
+async def cancel_task_endpoint(
+    task_id: str,
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Cancel a task. Queued tasks are cancelled immediately; running tasks
+    are stopped by their worker within a poll interval.
+    """
+    statuses = await run_in_threadpool(get_task_statuses, [task_id], 0, current_user.id)
+    if task_id not in statuses:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    return await run_in_threadpool(cancel_tasks, [task_id], current_user.id)
+
+@router.post("/status", response_model=Dict[str, Any])
+async def get_task_statuses_endpoint(
+    query: TaskStatusQuery,
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Get the status of many tasks in one request.
+
+    Pass ``task_ids`` and/or a ``batch_id``. With ``since_version`` only tasks
+    that changed after that version are returned; send back the returned
+    ``version`` on the next poll.
+    """
+    task_ids = list(query.task_ids)
+    if query.batch_id:
+        task_ids.extend(await run_in_threadpool(get_batch_task_ids, query.batch_id))
+    task_ids = list(dict.fromkeys(task_ids))
+    
+    if len(task_ids) > settings.TASK_STATUS_QUERY_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot query more than {settings.TASK_STATUS_QUERY_LIMIT} tasks at once"
+        )
+    
+    statuses = await run_in_threadpool(
+        get_task_statuses, task_ids, since_version=query.since_version, owner_id=current_user.id
+    )
+    
+    # On a full fetch, report tasks that are gone or belong to someone else
+    if query.since_version == 0:
+        for task_id in task_ids:
+            statuses.setdefault(task_id, unknown_task_status())
+    
+    version = max([query.since_version] + [s.get("version", 0) for s in statuses.values()])
+    return {"version": version, "tasks": statuses}
+
+@router.get("/events")
+async def stream_task_events(
+    request: Request,
+    batch_id: Optional[str] = None,
+    task_ids: Optional[str] = Query(None, description="Comma-separated task IDs"),
+    since_version: int = 0,
+    current_user: User = Depends(get_current_user_from_query),
+) -> Any:
+    """
+    Stream task progress and completion as Server-Sent Events.
+
+    Without ``batch_id`` or ``task_ids`` every task of the current user is
+    streamed; an unknown or expired ``batch_id`` is a 404. Each ``task`` event carries the task status and uses its version
+    as the event id, so a reconnecting EventSource resumes where it left off.
+    When specific tasks are watched a ``done`` event is sent once they have
+    all finished.
+    """
+    watched = [task_id.strip() for task_id in (task_ids or "").split(",") if task_id.strip()]
+    if batch_id:
+        batch_task_ids = await run_in_threadpool(get_batch_task_ids, batch_id)
+        # Without this check an unknown or expired batch would stream every
+        # task of the user and never send done
+        if not batch_task_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Batch not found"
+            )
+        watched.extend(batch_task_ids)
+    watched = list(dict.fromkeys(watched))
+    
+    if len(watched) > settings.TASK_STATUS_QUERY_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot watch more than {settings.TASK_STATUS_QUERY_LIMIT} tasks at once"
+        )
+    
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        since_version = max(since_version, int(last_event_id))
+    
+    def fetch_changes(version: int) -> Dict[str, Dict[str, Any]]:
+        if watched:
+            changes = get_task_statuses(watched, since_version=version, owner_id=current_user.id)
+            return dict(sorted(changes.items(), key=lambda item: item[1]["version"]))
+        return get_changed_tasks(current_user.id, since_version=version)
+    
+    async def event_stream():
+        version = since_version
+        finished = set()
+        snapshot = None
+        if watched:
+            # A full fetch returns every watched task that still exists; the
+            # rest have expired or belong to someone else. Tasks that finished
+            # at or before since_version are not sent again but still count
+            # towards the done event, e.g. after a reconnect.
+            current = await run_in_threadpool(fetch_changes, 0)
+            finished.update(
+                task_id for task_id in watched
+                if task_id not in current or current[task_id]["status"] in FINISHED_STATES
+            )
+            if version == 0:
+                snapshot = current
+        last_sent = time.monotonic()
+        while not await request.is_disconnected():
+            changes = snapshot if snapshot is not None else await run_in_threadpool(fetch_changes, version)
+            snapshot = None
+            for task_id, task_status in changes.items():
+                version = max(version, task_status["version"])
+                if task_status["status"] in FINISHED_STATES:
+                    finished.add(task_id)
+                data = json.dumps({"task_id": task_id, **task_status}, default=str)
+                yield f"id: {task_status['version']}\nevent: task\ndata: {data}\n\n"
+                last_sent = time.monotonic()
+            
+            if watched and finished.issuperset(watched):
+                yield f"event: done\ndata: {json.dumps({'version': version})}\n\n"
+                return
+            
+            # Comment lines keep proxies from closing an idle connection
+            if time.monotonic() - last_sent > settings.TASK_EVENTS_KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+            
+            await asyncio.sleep(settings.TASK_EVENTS_INTERVAL_SECONDS)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/stats", response_model=Dict[str, Any])
+async def get_task_stats_endpoint(
+    current_user: User = Depends(get_current_active_admin),
+) -> Any:
+    """
+    Get memory and eviction statistics for the task store, the current queue
+    wait estimate and HTTP cache metrics.
+    """
+    stats = await run_in_threadpool(get_task_store_stats)
+    stats["queue"] = await run_in_threadpool(estimate_queue_wait)
+    if http_cache is not None:
+        stats["http_cache"] = await run_in_threadpool(http_cache.stats)
+    return stats
+
 # app/api/tasks.py
 @router.post("/save-email", response_model=Dict[str, Any])
 async def save_generated_email(
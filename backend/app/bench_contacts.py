@@ -0,0 +1,180 @@
+# app/bench_contacts.py
+"""
+Contact extraction benchmark.
+
+Times finding the emails and phone numbers in the text and links of contact
+and team pages with ``extract_contacts`` against the previous approach (a
+regex scan per contact type, list-based deduplication), and reports how many
+of each both find. The page text is taken beforehand, as ``summarize_page``
+collects it during its walk of the tree:
+
+    python -m app.bench_contacts
+    python -m app.bench_contacts --iterations 50 saved_team_page.html
+
+The built-in sample pages list their real contacts among asset names,
+version strings, order numbers and IDs. On those, anything else found is
+reported as a false positive and anything not found as missed; the
+benchmark exits with status 1 if ``extract_contacts`` has either.
+"""
+import argparse
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.utils.contact_extractor import extract_contacts
+from app.utils.html_parser import parse_html
+
+# The previous implementation, kept as the baseline
+_PREVIOUS_EMAIL = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_PREVIOUS_PHONE = re.compile(r'(\+\d{1,3}[-.\s]?)?(\(?\d{3}\)?[-.\s]?)?\d{3}[-.\s]?\d{4}')
+
+
+def previous_contacts(text: str, mailto_hrefs: List[str], tel_hrefs: List[str]) -> Tuple[List[str], List[str]]:
+    emails = _PREVIOUS_EMAIL.findall(text)
+    for href in mailto_hrefs:
+        email = href.replace('mailto:', '').split('?')[0].strip()
+        if email and email not in emails:
+            emails.append(email)
+
+    phones = []
+    for phone_parts in _PREVIOUS_PHONE.findall(text):
+        phone = ''.join(phone_parts).strip()
+        if phone:
+            phones.append(re.sub(r'[-.\s]+', '-', phone))
+    for href in tel_hrefs:
+        phone = href.replace('tel:', '').strip()
+        if phone and phone not in phones:
+            phones.append(phone)
+    return emails, phones
+
+
+def current_contacts(text: str, mailto_hrefs: List[str], tel_hrefs: List[str]) -> Tuple[List[str], List[str]]:
+    contacts = extract_contacts(text, mailto_hrefs, tel_hrefs)
+    return contacts["emails"], contacts["phones"]
+
+
+def _sample_page(people: int) -> Tuple[str, Set[str], Set[str]]:
+    """
+    A team page listing ``people`` staff members, with the usual noise, and
+    the lowercased emails and the digits of the phone numbers it lists.
+    """
+    cards = []
+    emails = {"info@example.com"}
+    phones = {"5550100000"}
+    for i in range(people):
+        cards.append(
+            f'<div class="team-member"><img src="/img/staff-{i}@2x.png" alt="staff-{i}@2x.png">'
+            f'<h3 class="name">Person {i}</h3><p class="position">Engineer, release v2.{i}.1000000</p>'
+            f'<p>Email person{i}@example.com or <a href="mailto:person{i}@example.com">write</a>. '
+            f'Call +1 (555) {i % 1000:03d}-{i % 10000:04d} or <a href="tel:+1555{i % 1000:03d}{i % 10000:04d}">dial</a>. '
+            f'Office: 555.{i % 1000:03d}.{i % 10000:04d}, order #2024{i:06d}, ID 9{i:09d}.</p></div>'
+        )
+        emails.add(f"person{i}@example.com")
+        phones.add(f"1555{i % 1000:03d}{i % 10000:04d}")
+        phones.add(f"555{i % 1000:03d}{i % 10000:04d}")
+    html = (
+        "<!DOCTYPE html><html><head><title>Our Team | Example Corp</title></head><body>"
+        f'<main><section class="team">{"".join(cards)}</section></main>'
+        '<footer>General enquiries: <a href="mailto:info@example.com">info@example.com</a>, tel 555-010-0000</footer></body></html>'
+    )
+    return html, emails, phones
+
+
+_SAMPLES = {
+    "contact": _sample_page(3),
+    "team": _sample_page(100),
+    "large team": _sample_page(2000),
+}
+SAMPLE_PAGES = {page: html for page, (html, _, _) in _SAMPLES.items()}
+SAMPLE_CONTACTS = {page: (emails, phones) for page, (_, emails, phones) in _SAMPLES.items()}
+
+
+def _per_call_ms(func: Callable[[], Any], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def _errors(
+    emails: List[str], phones: List[str], expected: Optional[Tuple[Set[str], Set[str]]]
+) -> Optional[Tuple[int, int]]:
+    """Count false positives and missed contacts, if the page's contacts are known."""
+    if expected is None:
+        return None
+    expected_emails, expected_phones = expected
+    found_emails = {email.lower() for email in emails}
+    found_phones = {re.sub(r'\D', '', phone) for phone in phones}
+    false_positives = len(found_emails - expected_emails) + len(found_phones - expected_phones)
+    missed = len(expected_emails - found_emails) + len(expected_phones - found_phones)
+    return false_positives, missed
+
+
+def run(
+    pages: Dict[str, str], iterations: int, expected: Optional[Dict[str, Tuple[Set[str], Set[str]]]] = None
+) -> List[Dict[str, Any]]:
+    """Return one timing row per page, with extraction errors where ``expected`` knows the contacts."""
+    expected = expected or {}
+    rows = []
+    for page, html in pages.items():
+        soup = parse_html(html)
+        args = (
+            soup.get_text(),
+            [link.get('href', '') for link in soup.select('a[href^="mailto:"]')],
+            [link.get('href', '') for link in soup.select('a[href^="tel:"]')],
+        )
+        previous_emails, previous_phones = previous_contacts(*args)
+        emails, phones = current_contacts(*args)
+        rows.append({
+            "page": page,
+            "kb": len(html.encode()) / 1024,
+            "previous_ms": _per_call_ms(lambda: previous_contacts(*args), iterations),
+            "current_ms": _per_call_ms(lambda: current_contacts(*args), iterations),
+            "previous_found": f"{len(previous_emails)}/{len(previous_phones)}",
+            "current_found": f"{len(emails)}/{len(phones)}",
+            "previous_errors": _errors(previous_emails, previous_phones, expected.get(page)),
+            "current_errors": _errors(emails, phones, expected.get(page)),
+        })
+    return rows
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark email and phone number extraction.")
+    parser.add_argument("pages", nargs="*", help="HTML files to use instead of the built-in sample pages")
+    parser.add_argument("--iterations", type=int, default=20, help="Extractions per page (default: 20)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    pages, expected = SAMPLE_PAGES, SAMPLE_CONTACTS
+    if args.pages:
+        pages, expected = {}, {}
+        for path in args.pages:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                pages[path] = f.read()
+
+    rows = run(pages, max(1, args.iterations), expected)
+    print(
+        f"{'page':<24} {'size':>9}  {'previous':>10} {'current':>10} {'speedup':>8}  "
+        f"{'emails/phones found':>24}  {'false positives/missed':>24}"
+    )
+    failed = False
+    for row in rows:
+        speedup = row["previous_ms"] / row["current_ms"] if row["current_ms"] else 0.0
+        errors = ""
+        if row["current_errors"] is not None:
+            errors = f"{'%d/%d' % row['previous_errors']:>11} -> {'%d/%d' % row['current_errors']:<11}"
+            failed = failed or any(row["current_errors"])
+        print(
+            f"{row['page'][-24:]:<24} {row['kb']:>7.1f}kB  {row['previous_ms']:>8.2f}ms {row['current_ms']:>8.2f}ms "
+            f"{speedup:>7.1f}x  {row['previous_found']:>11} -> {row['current_found']:<11}  {errors}"
+        )
+    if failed:
+        print("\nextract_contacts found false positives or missed contacts.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# app/bench_parsers.py
+"""
+HTML parser benchmark.
+
+Parses sample pages with every installed parser backend and reports the
+per-page cost of parsing, of running the individual extractors on the
+parsed page and of the single-pass ``summarize_page``. Checks that each
+backend extracts exactly what ``html.parser`` does and that
+``summarize_page`` agrees with the individual company and contact
+extractors:
+
+    python -m app.bench_parsers
+    python -m app.bench_parsers --iterations 50 saved_page.html other_page.html
+
+Exits with status 1 on any difference, so a backend is only worth selecting
+with HTML_PARSER if it passes here.
+"""
+import argparse
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.utils.html_parser import available_parsers, get_parser_name, parse_html
+from app.utils.llm_agent import extract_contact_person, extract_emails, extract_phone_numbers
+from app.utils.page_extractor import summarize_page
+from app.utils.web_scraper import (
+    extract_business_areas,
+    extract_company_description,
+    extract_company_name,
+    find_about_page_url,
+    find_contact_page_url,
+)
+
+BASE_URL = "https://www.example.com/"
+REFERENCE_PARSER = "html.parser"
+
+
+def _sample_page(sections: int, malformed: bool = False) -> str:
+    """A company homepage with ``sections`` repeated content blocks."""
+    blocks = []
+    for i in range(sections):
+        blocks.append(
+            f'<section class="feature-{i}"><h2>Feature {i}</h2>'
+            f'<p>Paragraph {i} about what we do, with <a href="/blog/{i}">a link</a> and <b>bold text</b>.</p>'
+            f'<ul><li>Point {i}.1</li><li>Point {i}.2</li></ul></section>'
+        )
+    body = "".join(blocks)
+    if malformed:
+        # Unclosed tags and stray end tags, as found on real sites
+        body = body.replace("</p>", "", sections // 2).replace("</li>", "</div></li>", sections // 3)
+    return (
+        "<!DOCTYPE html><html><head><title>Example Corp | Industrial Widgets</title>"
+        '<meta name="description" content="Example Corp builds industrial widgets.">'
+        '<meta property="og:site_name" content="Example Corp"></head><body>'
+        '<nav><a href="/">Home</a><a href="/about-us">About us</a><a href="/contact">Contact</a></nav>'
+        '<main><div id="services"><h3>Widget design</h3><h3>Widget repair</h3></div>'
+        f'<div class="about"><p>Founded in 1990.</p><p>Family owned.</p></div>{body}'
+        '<div class="team"><h4>Jane Doe</h4> <p class="position">Head of Sales</p>\n'
+        '<p>jane.doe@example.com, +1 (555) 010-2000, <a href="tel:+15550102001">direct line</a></p></div></main>\n'
+        '<footer><a href="mailto:info@example.com">info@example.com</a> '
+        '<a href="mailto:INFO@example.com?subject=Hello">write to us</a> 555.010.3000</footer></body></html>'
+    )
+
+
+SAMPLE_PAGES = {
+    "small": _sample_page(10),
+    "medium": _sample_page(300),
+    "large": _sample_page(3000),
+    "malformed": _sample_page(300, malformed=True),
+}
+
+EXTRACTORS: Dict[str, Callable[[Any], Any]] = {
+    "name": lambda soup: extract_company_name(soup, BASE_URL),
+    "description": extract_company_description,
+    "business_areas": extract_business_areas,
+    "about_url": lambda soup: find_about_page_url(soup, BASE_URL),
+    "contact_url": lambda soup: find_contact_page_url(soup, BASE_URL),
+    "emails": extract_emails,
+    "phones": extract_phone_numbers,
+    "contact_person": extract_contact_person,
+}
+
+
+def extract_all(soup: Any) -> Dict[str, Any]:
+    return {field: extractor(soup) for field, extractor in EXTRACTORS.items()}
+
+
+def _per_call_ms(func: Callable[[], Any], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def run(pages: Dict[str, str], iterations: int) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Return one timing row per (page, parser) and the extraction mismatches."""
+    rows = []
+    mismatches = []
+    for page, html in pages.items():
+        expected = extract_all(parse_html(html, REFERENCE_PARSER))
+        for parser in available_parsers():
+            soup = parse_html(html, parser)
+            result = extract_all(soup)
+            summary = summarize_page(soup, BASE_URL)
+            for field, value in expected.items():
+                if result[field] != value:
+                    mismatches.append(f"{page}/{parser}: {field} is {result[field]!r}, expected {value!r}")
+                if summary[field] != value:
+                    mismatches.append(
+                        f"{page}/{parser}: summarize_page {field} is {summary[field]!r}, expected {value!r}"
+                    )
+            rows.append({
+                "page": page,
+                "kb": len(html.encode()) / 1024,
+                "parser": parser,
+                "parse_ms": _per_call_ms(lambda: parse_html(html, parser), iterations),
+                "extract_ms": _per_call_ms(lambda: extract_all(soup), iterations),
+                "summary_ms": _per_call_ms(lambda: summarize_page(soup, BASE_URL), iterations),
+            })
+    return rows, mismatches
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the HTML parser backends.")
+    parser.add_argument("pages", nargs="*", help="HTML files to use instead of the built-in sample pages")
+    parser.add_argument("--iterations", type=int, default=20, help="Parses per page and backend (default: 20)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    pages = SAMPLE_PAGES
+    if args.pages:
+        pages = {}
+        for path in args.pages:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                pages[path] = f.read()
+
+    rows, mismatches = run(pages, max(1, args.iterations))
+    print(f"{'page':<24} {'size':>9}  {'parser':<12} {'parse':>10} {'extractors':>11} {'single pass':>12}")
+    for row in rows:
+        print(
+            f"{row['page'][-24:]:<24} {row['kb']:>7.1f}kB  {row['parser']:<12} "
+            f"{row['parse_ms']:>8.2f}ms {row['extract_ms']:>9.2f}ms {row['summary_ms']:>10.2f}ms"
+        )
+    print(f"\nConfigured backend (HTML_PARSER): {get_parser_name()}")
+    if mismatches:
+        print("\nExtraction differs:")
+        for mismatch in mismatches:
+            print(f"  {mismatch}")
+        sys.exit(1)
+    print("All backends extract identical results.")
+
+
+if __name__ == "__main__":
+    main()
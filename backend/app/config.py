@@ -28,6 +28,67 @@ class Settings(BaseSettings):
     DEFAULT_MAX_WEBSITES_PER_EMAIL: int = 3
     DEFAULT_MAX_EMAILS_PER_DAY: int = 10
     
+    # Background task workers
+    TASK_BACKEND: str = "sqlite"  # "sqlite" (shared, durable) or "memory" (single process)
+    TASK_DB_PATH: str = "./tasks.db"
+    TASK_RUN_EMBEDDED_WORKER: bool = True  # Disable when running `python -m app.worker` processes
+    TASK_WORKER_CONCURRENCY: int = 8  # Tasks processed concurrently per worker
+    TASK_RESULT_TTL_SECONDS: int = 60 * 60  # Finished tasks are kept for 1 hour
+    TASK_STORE_MAX_ENTRIES: int = 10000
+    TASK_STORE_MAX_BYTES: int = 50 * 1024 * 1024  # 50 MB
+    TASK_CLEANUP_INTERVAL_SECONDS: int = 60
+    TASK_POLL_INTERVAL_SECONDS: float = 1.0  # How often idle workers check the queue
+    TASK_LEASE_SECONDS: int = 10 * 60  # Running tasks without progress for this long are requeued
+    TASK_STATUS_QUERY_LIMIT: int = 1000  # Max tasks per bulk status request
+    TASK_EVENTS_INTERVAL_SECONDS: float = 0.5  # How often event streams check for changes
+    TASK_EVENTS_KEEPALIVE_SECONDS: float = 15.0
+    TASK_INTERACTIVE_MAX_URLS: int = 3  # Requests this small are scheduled ahead of bulk batches
+    TASK_DEADLINE_SECONDS: int = 5 * 60  # Running tasks are aborted after this long (0 disables)
+    TASK_MAX_QUEUE_DEPTH: int = 5000  # Submissions beyond this many queued tasks get a 429 (0 disables)
+    TASK_MAX_QUEUE_WAIT_SECONDS: int = 30 * 60  # Bulk submissions that would wait longer get a 429 (0 disables)
+    TASK_THROUGHPUT_WINDOW_SECONDS: int = 5 * 60  # Window for measuring recent task throughput
+    TASK_ESTIMATED_DURATION_SECONDS: float = 30.0  # Assumed task duration until tasks have finished
+    
+    # Outgoing HTTP requests (website scraping)
+    HTTP_TIMEOUT_SECONDS: float = 30.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 10.0  # Unreachable hosts fail after this long
+    HTTP_MAX_PAGE_BYTES: int = 1024 * 1024  # Pages are cut off after this many bytes
+    HTTP_MAX_CONNECTIONS: int = 100  # Open connections per process
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 4
+    HTTP_SITE_CONCURRENCY: int = 3  # Secondary pages of one site fetched at the same time
+    HTTP_DNS_CACHE_SECONDS: int = 300
+    HTTP_KEEPALIVE_SECONDS: float = 30.0  # How long idle connections are kept for reuse
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_PATH: str = "./http_cache.db"
+    HTTP_CACHE_MAX_BYTES: int = 200 * 1024 * 1024  # 200 MB of compressed pages
+    HTTP_CACHE_DEFAULT_TTL_SECONDS: int = 60 * 60  # Freshness of pages without caching headers
+    HTTP_CACHE_HEURISTIC_MAX_SECONDS: int = 24 * 60 * 60  # Cap for freshness derived from Last-Modified
+    HTTP_FAILURE_TTL_SECONDS: int = 5 * 60  # Requests to a domain that just failed fail fast this long
+    HTTP_FAILURE_MAX_TTL_SECONDS: int = 24 * 60 * 60  # Cap for the doubling after repeated failures
+    HTTP_HOST_REQUESTS_PER_SECOND: float = 2.0  # Pace of requests to one host (0 disables pacing)
+    HTTP_HOST_BURST: int = 4  # Requests to one host sent without pacing after a quiet period
+    HTTP_HOST_BACKOFF_SECONDS: float = 10.0  # Pause after a 429/503 without Retry-After
+    HTTP_HOST_MAX_DELAY_SECONDS: float = 30.0  # Cap for robots.txt Crawl-delay and Retry-After pauses
+    HTTP_ROBOTS_ENABLED: bool = True  # Read robots.txt for Crawl-delay
+    HTTP_ROBOTS_OBEY_DISALLOW: bool = False  # Also skip pages robots.txt disallows
+    HTTP_ROBOTS_TTL_SECONDS: int = 24 * 60 * 60
+    HTTP_ROBOTS_TIMEOUT_SECONDS: float = 5.0
+    HTTP_SITEMAP_FALLBACK: bool = True  # Look for about/contact pages in sitemap.xml when the homepage links none
+    HTTP_CONTACT_SEARCH_MAX_PAGES: int = 4  # Pages tried per contact search, best candidates first
+    
+    # HTML parsing: "auto" (fastest installed), "lxml" or "html.parser"
+    HTML_PARSER: str = "auto"
+    HTML_PARSE_PROCESSES: int = 0  # Parse pages in this many worker processes (0 parses on the event loop)
+    HTML_PARSE_POOL_MIN_BYTES: int = 32 * 1024  # Smaller pages are parsed inline, which beats the IPC cost
+    
+    # Target website profiles shared across users
+    TARGET_PROFILE_MAX_AGE_SECONDS: int = 7 * 24 * 60 * 60  # Profiles are fresh for this long
+    TARGET_PROFILE_STALE_SECONDS: int = 30 * 24 * 60 * 60  # Then served while refreshed in the background
+    TARGET_PROFILE_REFRESH_INTERVAL_SECONDS: int = 10 * 60  # How often popular profiles are checked
+    TARGET_PROFILE_REFRESH_AHEAD_SECONDS: int = 24 * 60 * 60  # Refresh popular profiles this long before they expire
+    TARGET_PROFILE_REFRESH_MIN_REQUESTS: int = 3  # Requests since the last scrape that make a profile popular
+    TARGET_PROFILE_REFRESH_BATCH_SIZE: int = 50  # Refreshes queued per check
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,70 @@
+from typing import Optional, Dict, Any, List
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+from app.models.target_profile import TargetProfile
+
+
+def get_by_domain(db: Session, domain: str) -> Optional[TargetProfile]:
+    return db.query(TargetProfile).filter(TargetProfile.domain == domain).first()
+
+
+def get_due_for_refresh(
+    db: Session, *, scraped_before: datetime, requested_after: datetime, min_requests: int, limit: int = 50
+) -> List[TargetProfile]:
+    """Profiles scraped before `scraped_before` that were requested often and recently."""
+    return (
+        db.query(TargetProfile)
+        .filter(
+            TargetProfile.scraped_at < scraped_before,
+            TargetProfile.last_requested_at >= requested_after,
+            TargetProfile.request_count >= min_requests,
+        )
+        .order_by(TargetProfile.request_count.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def record_request(db: Session, profile: TargetProfile) -> None:
+    """Count a generation request served from `profile`."""
+    db.query(TargetProfile).filter(TargetProfile.id == profile.id).update(
+        {
+            TargetProfile.request_count: TargetProfile.request_count + 1,
+            TargetProfile.last_requested_at: datetime.utcnow(),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def save_website_info(db: Session, *, domain: str, url: str, target_info: Dict[str, Any]) -> TargetProfile:
+    """Create or refresh the profile of a domain from `analyze_website` output."""
+    profile = get_by_domain(db, domain)
+    if not profile:
+        profile = TargetProfile(domain=domain, last_requested_at=datetime.utcnow())
+        db.add(profile)
+    
+    profile.url = url
+    profile.name = target_info.get("name")
+    profile.description = target_info.get("description")
+    profile.business_areas = target_info.get("business_areas", [])
+    profile.contact_url = target_info.get("contact_url")
+    profile.scraped_at = datetime.utcnow()
+    profile.request_count = 0
+    db.commit()
+    db.refresh(profile)
+    return profile
+
+
+def save_contact_info(db: Session, *, domain: str, contact_info: Dict[str, Any]) -> Optional[TargetProfile]:
+    """Attach `find_contact_information` output to an existing profile."""
+    profile = get_by_domain(db, domain)
+    if not profile:
+        return None
+    
+    profile.contact_info = contact_info
+    profile.contact_scraped_at = datetime.utcnow()
+    db.commit()
+    db.refresh(profile)
+    return profile
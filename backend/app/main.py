@@ -10,14 +10,15 @@ from app.models.user import User
 from app.db.base import Base, engine
 from app.db.session import get_db, SessionLocal
 from app.utils.security import get_password_hash
+from app.utils.http_client import close_session
+from app.utils.parse_pool import shutdown_parse_pool
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Import and initialize the task queue
+# Import the task queue; the embedded worker pool is started on startup
 from app.utils import task_queue
-logger.info("Task queue imported and worker should be running")
 
 # Create tables in the database
 Base.metadata.create_all(bind=engine)
@@ -71,12 +72,21 @@ def create_admin_user():
 async def startup_event():
     logger.info("Application starting up")
     create_admin_user()
-    # Ensure task queue worker is running
-    if not task_queue.worker_thread.is_alive():
-        logger.warning("Worker thread not alive, starting a new one")
-        task_queue.worker_thread = task_queue.start_background_worker()
+    # Run tasks in this process unless dedicated worker processes handle them
+    if not settings.TASK_RUN_EMBEDDED_WORKER:
+        logger.info("Embedded worker disabled, tasks are processed by `python -m app.worker`")
+    elif task_queue.worker_pool is None or not task_queue.worker_pool.is_alive():
+        logger.info("Starting embedded worker pool")
+        task_queue.start_background_worker()
     else:
-        logger.info("Worker thread is alive")
+        logger.info("Worker pool is alive")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if task_queue.worker_pool is not None:
+        task_queue.worker_pool.stop()
+    await close_session()
+    shutdown_parse_pool()
 
 @app.get("/", include_in_schema=False)
 async def root():
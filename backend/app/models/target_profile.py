@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class TargetProfile(Base):
+    """What was learned about a prospect's website, shared by all users."""
+    __tablename__ = "target_profiles"
+
+    id = Column(Integer, primary_key=True, index=True)
+    domain = Column(String, unique=True, index=True)
+    url = Column(String, nullable=True)
+    name = Column(String)
+    description = Column(Text, nullable=True)
+    business_areas = Column(JSON, nullable=True)
+    contact_url = Column(String, nullable=True)
+    contact_info = Column(JSON, nullable=True)
+    scraped_at = Column(DateTime(timezone=True))
+    contact_scraped_at = Column(DateTime(timezone=True), nullable=True)
+    # Generation requests served since the last scrape, for proactive refreshes
+    request_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_requested_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+
+
+class TaskStatusQuery(BaseModel):
+    task_ids: List[str] = Field(default_factory=list, description="IDs of the tasks to look up")
+    batch_id: Optional[str] = Field(None, description="Look up every task created by one generate-emails request")
+    since_version: int = Field(0, description="Only return tasks that changed after this version")
@@ -0,0 +1,93 @@
+# app/utils/contact_extractor.py
+import re
+from html import unescape
+from typing import Dict, Iterable, List
+
+# Emails and phone numbers are found in one scan of the page text. Phone
+# numbers must stand on their own, so digit runs inside version strings,
+# file names and longer numbers are not taken for phone numbers; see
+# _is_phone for order numbers and other IDs.
+_CONTACT = re.compile(
+    r'(?P<email>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b)'
+    r'|(?P<phone>(?<![\w.])(?:\+\d{1,3}[-.\s]?)?(?:\(?\d{3}\)?[-.\s]?)?\d{3}[-.\s]?\d{4}(?!\w|\.\d))'
+)
+_PHONE_SEPARATORS = re.compile(r'[-.\s]+')
+_NON_DIGITS = re.compile(r'\D')
+# Labels of order, invoice and other reference numbers ("#2024000123", "No. 555 1234")
+_REFERENCE_LABEL = re.compile(r'(?:#|\b(?:no|nr)\.)\s*$', re.I)
+# A formatted phone number from the text is digits plus these
+_PHONE_PUNCTUATION = str.maketrans('', '', '-+()')
+
+# mailto: and tel: links in raw HTML, for finding them without parsing
+_MAILTO_HREF = re.compile(r'''href\s*=\s*["']?\s*mailto:([^"'\s>]+)''', re.I)
+_TEL_HREF = re.compile(r'''href\s*=\s*["']?\s*tel:([^"'>]+)''', re.I)
+
+# "Emails" that are really asset names such as logo@2x.png
+_ASSET_SUFFIXES = (
+    '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.avif', '.ico', '.bmp',
+    '.css', '.js', '.json', '.map', '.woff', '.woff2', '.ttf',
+)
+
+
+def _is_email(candidate: str) -> bool:
+    return not candidate.lower().endswith(_ASSET_SUFFIXES)
+
+
+def _is_phone(text: str, start: int, candidate: str) -> bool:
+    # Ten or more bare digits are written as IDs, order or account numbers;
+    # phone numbers come with separators or a country code
+    if len(candidate) >= 10 and candidate.isdigit():
+        return False
+    return not _REFERENCE_LABEL.search(text[max(0, start - 6):start])
+
+
+def extract_contacts(
+    text: str,
+    mailto_hrefs: Iterable[str] = (),
+    tel_hrefs: Iterable[str] = (),
+) -> Dict[str, List[str]]:
+    """
+    Return ``{"emails": [...], "phones": [...]}`` found in ``text``, followed
+    by those of ``mailto:`` and ``tel:`` links, in order of appearance.
+
+    Emails are deduplicated case-insensitively and phone numbers by their
+    digits, so ``+1 (555) 123-4567`` and ``tel:+15551234567`` count once.
+    Phone numbers from the text have their separators normalized to ``-``.
+    """
+    emails: Dict[str, str] = {}
+    phones: Dict[str, str] = {}
+
+    for match in _CONTACT.finditer(text):
+        value = match.group()
+        if match.lastgroup == 'email':
+            if _is_email(value):
+                emails.setdefault(value.lower(), value)
+        elif _is_phone(text, match.start(), value):
+            phone = _PHONE_SEPARATORS.sub('-', value)
+            phones.setdefault(phone.translate(_PHONE_PUNCTUATION), phone)
+
+    for href in mailto_hrefs:
+        email = href.replace('mailto:', '').split('?')[0].strip()
+        if email:
+            emails.setdefault(email.lower(), email)
+
+    for href in tel_hrefs:
+        phone = href.replace('tel:', '').strip()
+        digits = _NON_DIGITS.sub('', phone)
+        if digits:
+            phones.setdefault(digits, phone)
+
+    return {"emails": list(emails.values()), "phones": list(phones.values())}
+
+
+def scan_contact_links(html: str) -> Dict[str, List[str]]:
+    """
+    ``extract_contacts`` of only the ``mailto:`` and ``tel:`` links of raw
+    HTML, found with a regex rather than by parsing the page. Much cheaper
+    than a parse, but misses addresses that only appear in the text.
+    """
+    return extract_contacts(
+        "",
+        [f"mailto:{unescape(address)}" for address in _MAILTO_HREF.findall(html)],
+        [f"tel:{unescape(number)}" for number in _TEL_HREF.findall(html)],
+    )
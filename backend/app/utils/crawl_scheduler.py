@@ -0,0 +1,229 @@
+# app/utils/crawl_scheduler.py
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_ROBOTS_MAX_BYTES = 512 * 1024
+# Hosts whose buckets and robots.txt rules are kept per process
+_MAX_HOSTS = 10000
+
+
+class DisallowedByRobotsError(Exception):
+    """Raised without sending a request when robots.txt disallows the URL."""
+
+
+class _TokenBucket:
+    """
+    Requests to one host. Tokens go negative for requests that are already
+    waiting, so concurrent callers are spaced out in arrival order.
+    """
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        """Take a token and return how long to wait before using it."""
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def pause(self, now: float, seconds: float):
+        """Hand out no tokens for ``seconds``, e.g. after a 429."""
+        self._refill(now)
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    def idle(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+# Shared by the API server loop and the embedded worker pool loop, which run
+# in different threads; waiting happens on each caller's own loop
+_lock = threading.Lock()
+_buckets: Dict[str, _TokenBucket] = {}
+# host -> (rules or None when the site has none, expiry time)
+_robots: Dict[str, Tuple[Optional[RobotFileParser], float]] = {}
+
+# Per event loop: the global request budget and robots.txt fetches in flight
+_budgets: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_robots_fetches: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = weakref.WeakKeyDictionary()
+
+
+def _budget() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    budget = _budgets.get(loop)
+    if budget is None:
+        # Sized like the connection pool, so a request that got a slot does
+        # not spend its timeout waiting for a connection
+        budget = _budgets[loop] = asyncio.Semaphore(settings.HTTP_MAX_CONNECTIONS)
+    return budget
+
+
+def _prune(now: float):
+    if len(_buckets) > _MAX_HOSTS:
+        for host in [host for host, bucket in _buckets.items() if bucket.idle(now)]:
+            del _buckets[host]
+    if len(_robots) > _MAX_HOSTS:
+        for host in [host for host, (_, expires_at) in _robots.items() if expires_at <= now]:
+            del _robots[host]
+        while len(_robots) > _MAX_HOSTS:
+            del _robots[next(iter(_robots))]
+
+
+async def _download_robots(session: aiohttp.ClientSession, origin: str) -> Tuple[Optional[RobotFileParser], float]:
+    """
+    Fetch and parse ``origin``'s robots.txt and return the rules (None when
+    there are none) with how long to keep them. Connection errors are
+    raised, as the site itself is unreachable then.
+    """
+    timeout = aiohttp.ClientTimeout(
+        total=settings.HTTP_ROBOTS_TIMEOUT_SECONDS, sock_connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS
+    )
+    try:
+        async with _budget():
+            async with session.get(f"{origin}/robots.txt", timeout=timeout) as response:
+                if response.status >= 500 or response.status == 429:
+                    # Asked again soon rather than kept for the day
+                    return None, settings.HTTP_FAILURE_TTL_SECONDS
+                if response.status >= 400:
+                    return None, settings.HTTP_ROBOTS_TTL_SECONDS
+                body = await response.content.read(_ROBOTS_MAX_BYTES)
+    except aiohttp.ClientConnectorError:
+        raise
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.info(f"Could not read {origin}/robots.txt: {str(e) or type(e).__name__}")
+        return None, settings.HTTP_FAILURE_TTL_SECONDS
+    rules = RobotFileParser()
+    rules.parse(body.decode("utf-8", errors="replace").splitlines())
+    return rules, settings.HTTP_ROBOTS_TTL_SECONDS
+
+
+async def _load_robots(session: aiohttp.ClientSession, host: str, origin: str) -> Optional[RobotFileParser]:
+    rules, ttl = await _download_robots(session, origin)
+    now = time.monotonic()
+    with _lock:
+        _robots[host] = (rules, now + ttl)
+        _prune(now)
+    return rules
+
+
+def _robots_fetch(session: aiohttp.ClientSession, host: str, origin: str) -> Tuple["asyncio.Task[Optional[RobotFileParser]]", bool]:
+    """The robots.txt fetch of ``host`` and whether this call started it."""
+    fetches = _robots_fetches.setdefault(asyncio.get_running_loop(), {})
+    fetch = fetches.get(host)
+    if fetch is not None:
+        return fetch, False
+    fetch = fetches[host] = asyncio.ensure_future(_load_robots(session, host, origin))
+
+    def done(task: asyncio.Task):
+        fetches.pop(host, None)
+        # Nobody may be waiting for it; the request itself reports
+        # connection errors
+        if not task.cancelled():
+            task.exception()
+
+    fetch.add_done_callback(done)
+    return fetch, True
+
+
+async def _get_robots(session: aiohttp.ClientSession, host: str, origin: str) -> Optional[RobotFileParser]:
+    """
+    The robots.txt rules of ``host``. Unless Disallow rules are obeyed, the
+    first request to a new host is not held up: it goes out at the default
+    pace while robots.txt is read, and requests arriving meanwhile wait for
+    the rules. Expired rules are used while they are read again.
+    """
+    with _lock:
+        entry = _robots.get(host)
+    if entry is not None and entry[1] > time.monotonic():
+        return entry[0]
+    fetch, started = _robots_fetch(session, host, origin)
+    if entry is None and (settings.HTTP_ROBOTS_OBEY_DISALLOW or not started):
+        return await asyncio.shield(fetch)
+    return entry[0] if entry is not None else None
+
+
+def _host_limits(rules: Optional[RobotFileParser]) -> Tuple[float, float]:
+    """Requests per second and burst size for a host with these robots.txt rules."""
+    rate = settings.HTTP_HOST_REQUESTS_PER_SECOND
+    burst = max(1.0, float(settings.HTTP_HOST_BURST))
+    delay = rules.crawl_delay("*") if rules is not None else None
+    if delay:
+        delay = min(float(delay), settings.HTTP_HOST_MAX_DELAY_SECONDS)
+        if delay > 0:
+            return min(rate, 1 / delay), 1.0
+    return rate, burst
+
+
+def pause_host(host: str, seconds: Optional[float]):
+    """Hold back requests to ``host`` after it answered 429 or 503."""
+    if settings.HTTP_HOST_REQUESTS_PER_SECOND <= 0:
+        return
+    seconds = min(seconds or settings.HTTP_HOST_BACKOFF_SECONDS, settings.HTTP_HOST_MAX_DELAY_SECONDS)
+    now = time.monotonic()
+    with _lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = _TokenBucket(
+                settings.HTTP_HOST_REQUESTS_PER_SECOND, max(1.0, float(settings.HTTP_HOST_BURST)), now
+            )
+        bucket.pause(now, seconds)
+    logger.info(f"Pausing requests to {host} for {seconds:.0f}s")
+
+
+@asynccontextmanager
+async def request_slot(url: str, host: str, session: aiohttp.ClientSession) -> AsyncIterator[None]:
+    """
+    Wait until a request to ``url`` on ``host`` may be sent and hold a slot
+    of the global request budget while it runs.
+
+    Each host gets a token bucket of HTTP_HOST_REQUESTS_PER_SECOND with
+    bursts of HTTP_HOST_BURST, slowed down to the robots.txt Crawl-delay
+    (capped at HTTP_HOST_MAX_DELAY_SECONDS) when the site asks for one. With
+    HTTP_ROBOTS_OBEY_DISALLOW, disallowed URLs raise
+    ``DisallowedByRobotsError``. Buckets are per process, so separate worker
+    processes each pace their own requests.
+    """
+    rules = None
+    if settings.HTTP_ROBOTS_ENABLED:
+        parsed = urlparse(url)
+        rules = await _get_robots(session, host, f"{parsed.scheme}://{parsed.netloc}")
+        if rules is not None and settings.HTTP_ROBOTS_OBEY_DISALLOW and not rules.can_fetch("*", url):
+            raise DisallowedByRobotsError(f"{url} is disallowed by robots.txt")
+
+    if settings.HTTP_HOST_REQUESTS_PER_SECOND > 0:
+        rate, burst = _host_limits(rules)
+        now = time.monotonic()
+        with _lock:
+            bucket = _buckets.get(host)
+            if bucket is None:
+                bucket = _buckets[host] = _TokenBucket(rate, burst, now)
+            else:
+                # robots.txt may have been read or changed since
+                bucket.rate, bucket.capacity = rate, burst
+            wait = bucket.reserve(now)
+            _prune(now)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async with _budget():
+        yield
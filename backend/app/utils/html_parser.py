@@ -0,0 +1,48 @@
+# app/utils/html_parser.py
+import importlib.util
+import logging
+from functools import lru_cache
+from typing import List, Optional
+
+from bs4 import BeautifulSoup
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# BeautifulSoup tree builders the extractors are verified against, fastest
+# first, with the module each one needs (None for the standard library)
+PARSER_BACKENDS = {
+    "lxml": "lxml",
+    "html.parser": None,
+}
+
+
+def available_parsers() -> List[str]:
+    """Installed parser backends, fastest first."""
+    return [
+        name for name, module in PARSER_BACKENDS.items()
+        if module is None or importlib.util.find_spec(module) is not None
+    ]
+
+
+@lru_cache(maxsize=None)
+def get_parser_name() -> str:
+    """
+    Resolve ``HTML_PARSER``: ``auto`` picks the fastest installed backend,
+    and a configured backend that is not installed falls back to
+    ``html.parser``.
+    """
+    available = available_parsers()
+    configured = settings.HTML_PARSER
+    if configured == "auto":
+        return available[0]
+    if configured in available:
+        return configured
+    logger.warning(f"HTML parser {configured!r} is not available, using 'html.parser'")
+    return "html.parser"
+
+
+def parse_html(html: str, parser: Optional[str] = None) -> BeautifulSoup:
+    """Parse a page with the configured backend, or ``parser`` if given."""
+    return BeautifulSoup(html, parser or get_parser_name())
@@ -0,0 +1,301 @@
+# app/utils/http_cache.py
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Mapping
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version
+_MIGRATIONS = [
+    [
+        """CREATE TABLE responses (
+            url TEXT PRIMARY KEY,
+            status INTEGER NOT NULL,
+            encoding TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            body BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            stored_at REAL NOT NULL,
+            fresh_until REAL NOT NULL,
+            last_access REAL NOT NULL
+        )""",
+        "CREATE INDEX ix_responses_last_access ON responses (last_access)",
+        "CREATE TABLE metrics (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        """INSERT INTO metrics (name, value) VALUES
+            ('hits', 0), ('revalidations', 0), ('misses', 0), ('stores', 0), ('evictions', 0)""",
+    ],
+    [
+        """CREATE TABLE domain_failures (
+            domain TEXT PRIMARY KEY,
+            reason TEXT NOT NULL,
+            failures INTEGER NOT NULL,
+            failed_at REAL NOT NULL,
+            retry_at REAL NOT NULL
+        )""",
+        "INSERT INTO metrics (name, value) VALUES ('fast_failures', 0)",
+    ],
+    [
+        # Running total of the stored body sizes, so the budget check does
+        # not sum every response on each store
+        "INSERT INTO metrics (name, value) SELECT 'bytes', COALESCE(SUM(size), 0) FROM responses",
+        """CREATE TRIGGER responses_bytes_insert AFTER INSERT ON responses
+        BEGIN
+            UPDATE metrics SET value = value + NEW.size WHERE name = 'bytes';
+        END""",
+        """CREATE TRIGGER responses_bytes_update AFTER UPDATE OF size ON responses
+        BEGIN
+            UPDATE metrics SET value = value + NEW.size - OLD.size WHERE name = 'bytes';
+        END""",
+        """CREATE TRIGGER responses_bytes_delete AFTER DELETE ON responses
+        BEGIN
+            UPDATE metrics SET value = value - OLD.size WHERE name = 'bytes';
+        END""",
+    ],
+]
+
+_MAX_AGE = re.compile(r"(?:^|,)\s*(s-maxage|max-age)\s*=\s*\"?(\d+)", re.IGNORECASE)
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def freshness_lifetime(headers: Mapping[str, str], now: float) -> Optional[float]:
+    """
+    Return how many seconds a response stays fresh according to its headers,
+    or None if it must not be stored (``no-store``).
+
+    ``s-maxage``/``max-age`` win over ``Expires``; ``no-cache`` stores the
+    response but revalidates it on every use. Without explicit expiry the
+    usual heuristic of 10% of the time since ``Last-Modified`` applies,
+    falling back to ``HTTP_CACHE_DEFAULT_TTL_SECONDS``.
+    """
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0
+    max_ages = dict((name.lower(), int(value)) for name, value in _MAX_AGE.findall(cache_control))
+    if "s-maxage" in max_ages:
+        return max_ages["s-maxage"]
+    if "max-age" in max_ages:
+        return max_ages["max-age"]
+    if "Expires" in headers:
+        expires = _parse_http_date(headers.get("Expires"))
+        date = _parse_http_date(headers.get("Date")) or now
+        # Invalid dates such as "0" mean already expired
+        return max(0, expires - date) if expires is not None else 0
+    last_modified = _parse_http_date(headers.get("Last-Modified"))
+    if last_modified is not None:
+        date = _parse_http_date(headers.get("Date")) or now
+        return min(max(0, date - last_modified) / 10, settings.HTTP_CACHE_HEURISTIC_MAX_SECONDS)
+    return settings.HTTP_CACHE_DEFAULT_TTL_SECONDS
+
+
+class HTTPCache:
+    """
+    Persistent cache of fetched pages on a SQLite database in WAL mode.
+
+    Bodies are stored zlib-compressed and keyed by URL. Entries past their
+    freshness lifetime are kept so they can be revalidated with ``ETag`` /
+    ``Last-Modified``; once the stored bodies exceed ``max_bytes`` the least
+    recently used entries are evicted. Hit/miss counters live in the same
+    database so they cover every API and worker process.
+
+    The same database remembers domains that recently failed, so requests to
+    them can fail immediately until their retry time.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._migrate()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+            for version, statements in enumerate(_MIGRATIONS[current:], start=current + 1):
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached response for ``url`` as ``{"status", "encoding",
+        "body", "etag", "last_modified", "fresh"}``, or None.
+        """
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM responses WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (now, url))
+        return {
+            "status": row["status"],
+            "encoding": row["encoding"],
+            "body": zlib.decompress(row["body"]),
+            "etag": row["etag"],
+            "last_modified": row["last_modified"],
+            "fresh": row["fresh_until"] > now,
+        }
+
+    def store(self, url: str, status: int, headers: Mapping[str, str], body: bytes, encoding: Optional[str]):
+        """Cache a response unless its headers forbid it."""
+        now = time.time()
+        lifetime = freshness_lifetime(headers, now)
+        if lifetime is None:
+            return
+        compressed = zlib.compress(body)
+        conn = self._connect()
+        # An upsert rather than INSERT OR REPLACE, whose implicit delete
+        # would not fire the trigger keeping the byte total
+        conn.execute(
+            "INSERT INTO responses (url, status, encoding, etag, last_modified, body, size, "
+            "stored_at, fresh_until, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (url) DO UPDATE SET status = excluded.status, encoding = excluded.encoding, "
+            "etag = excluded.etag, last_modified = excluded.last_modified, body = excluded.body, "
+            "size = excluded.size, stored_at = excluded.stored_at, fresh_until = excluded.fresh_until, "
+            "last_access = excluded.last_access",
+            (url, status, encoding, headers.get("ETag"), headers.get("Last-Modified"),
+             compressed, len(compressed), now, now + lifetime, now),
+        )
+        self.record("stores")
+        self._enforce_budget()
+
+    def refresh(self, url: str, headers: Mapping[str, str]):
+        """Extend the freshness of an entry after a ``304 Not Modified``."""
+        now = time.time()
+        lifetime = freshness_lifetime(headers, now)
+        if lifetime is None:
+            self._connect().execute("DELETE FROM responses WHERE url = ?", (url,))
+            return
+        self._connect().execute(
+            "UPDATE responses SET fresh_until = ?, etag = COALESCE(?, etag), "
+            "last_modified = COALESCE(?, last_modified), last_access = ? WHERE url = ?",
+            (now + lifetime, headers.get("ETag"), headers.get("Last-Modified"), now, url),
+        )
+
+    def get_failure(self, domain: str) -> Optional[Dict[str, Any]]:
+        """
+        Return ``{"reason", "failures", "retry_at"}`` if ``domain`` failed
+        recently and should not be contacted yet, else None.
+        """
+        row = self._connect().execute(
+            "SELECT reason, failures, retry_at FROM domain_failures WHERE domain = ? AND retry_at > ?",
+            (domain, time.time()),
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def record_failure(self, domain: str, reason: str, retry_after: Optional[float] = None):
+        """
+        Remember that ``domain`` failed. Consecutive failures back off
+        exponentially from ``HTTP_FAILURE_TTL_SECONDS`` up to
+        ``HTTP_FAILURE_MAX_TTL_SECONDS``; a server-sent ``retry_after`` is
+        honored within that cap.
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT failures FROM domain_failures WHERE domain = ?", (domain,)).fetchone()
+            failures = row["failures"] + 1 if row is not None else 1
+            ttl = settings.HTTP_FAILURE_TTL_SECONDS * 2 ** min(failures - 1, 30)
+            ttl = min(max(ttl, retry_after or 0), settings.HTTP_FAILURE_MAX_TTL_SECONDS)
+            conn.execute(
+                "INSERT OR REPLACE INTO domain_failures (domain, reason, failures, failed_at, retry_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (domain, reason, failures, now, now + ttl),
+            )
+            # Domains that have not failed again for a full backoff period start over
+            conn.execute(
+                "DELETE FROM domain_failures WHERE retry_at < ?", (now - settings.HTTP_FAILURE_MAX_TTL_SECONDS,)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info(f"Marked {domain} as failing for {ttl:.0f}s after {failures} failure(s): {reason}")
+
+    def clear_failure(self, domain: str):
+        """Forget the failures of a domain after it responded successfully."""
+        self._connect().execute("DELETE FROM domain_failures WHERE domain = ?", (domain,))
+
+    def record(self, metric: str):
+        self._connect().execute("UPDATE metrics SET value = value + 1 WHERE name = ?", (metric,))
+
+    def _total_bytes(self) -> int:
+        return self._connect().execute("SELECT value FROM metrics WHERE name = 'bytes'").fetchone()[0]
+
+    def _enforce_budget(self):
+        conn = self._connect()
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% of the budget so eviction does not run on every store
+        target = total - self.max_bytes * 0.9
+        evicted = 0
+        freed = 0
+        for row in conn.execute("SELECT url, size FROM responses ORDER BY last_access").fetchall():
+            if freed >= target:
+                break
+            conn.execute("DELETE FROM responses WHERE url = ?", (row["url"],))
+            freed += row["size"]
+            evicted += 1
+        conn.execute("UPDATE metrics SET value = value + ? WHERE name = 'evictions'", (evicted,))
+        logger.info(f"Evicted {evicted} cached responses ({freed} bytes)")
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        metrics = {row["name"]: row["value"] for row in conn.execute("SELECT name, value FROM metrics")}
+        size = metrics.pop("bytes")
+        entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        failing = conn.execute("SELECT COUNT(*) FROM domain_failures WHERE retry_at > ?", (time.time(),)).fetchone()[0]
+        lookups = metrics["hits"] + metrics["revalidations"] + metrics["misses"]
+        return {
+            **metrics,
+            "hit_ratio": (metrics["hits"] + metrics["revalidations"]) / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "failing_domains": failing,
+        }
+
+
+def create_http_cache() -> Optional[HTTPCache]:
+    """Create the HTTP cache configured in settings, or None if it is disabled."""
+    if not settings.HTTP_CACHE_ENABLED:
+        return None
+    return HTTPCache(settings.HTTP_CACHE_PATH, settings.HTTP_CACHE_MAX_BYTES)
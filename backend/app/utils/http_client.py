@@ -0,0 +1,259 @@
+# app/utils/http_client.py
+import asyncio
+import logging
+import re
+import socket
+import time
+import weakref
+from typing import Any, Awaitable, Dict, Iterable, List, Mapping, Optional, Tuple, TypeVar, Union
+from urllib.parse import urlparse
+
+import aiohttp
+
+from app.config import settings
+from app.utils.crawl_scheduler import pause_host, request_slot
+from app.utils.http_cache import create_http_cache
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DomainUnavailableError(Exception):
+    """Raised without sending a request when the domain failed recently."""
+
+
+class UnsupportedContentError(Exception):
+    """Raised before reading the body when a page is not of an expected content type."""
+
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+XML_CONTENT_TYPES = ("application/xml", "text/xml")
+_CHUNK_SIZE = 64 * 1024
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+
+# Shared page cache, or None when HTTP_CACHE_ENABLED is off
+http_cache = create_http_cache()
+
+# One session per event loop: the API server and each worker pool run their
+# own loop, and an aiohttp session can only be used on the loop it was
+# created on. Entries disappear with their loop.
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Return the shared HTTP session of the running event loop, creating it on
+    first use.
+
+    All scraping goes through this session so connections, DNS lookups and
+    TLS sessions are reused across pages and tasks. Callers must not close it.
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=settings.HTTP_MAX_CONNECTIONS,
+            limit_per_host=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+            ttl_dns_cache=settings.HTTP_DNS_CACHE_SECONDS,
+            keepalive_timeout=settings.HTTP_KEEPALIVE_SECONDS,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(
+                total=settings.HTTP_TIMEOUT_SECONDS, sock_connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS
+            ),
+        )
+        _sessions[loop] = session
+        logger.info("Created shared HTTP session")
+    return session
+
+
+async def close_session():
+    """Close the shared HTTP session of the running event loop, if any."""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def _decode(body: bytes, encoding: Optional[str]) -> str:
+    try:
+        return body.decode(encoding or "utf-8", errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def _charset(content_type: str, body: bytes) -> Optional[str]:
+    # The whole body is not read, so aiohttp's get_encoding() cannot sniff it
+    match = re.search(r"charset=[\"']?([\w-]+)", content_type, re.IGNORECASE)
+    if match:
+        return match.group(1)
+    match = _META_CHARSET.search(body[:4096])
+    return match.group(1).decode("ascii") if match else None
+
+
+async def _read_capped(response: aiohttp.ClientResponse, max_bytes: int) -> bytes:
+    """Stream the body until it ends or ``max_bytes`` were read."""
+    chunks = []
+    size = 0
+    async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= max_bytes:
+            # The head, navigation and leading content carry what the
+            # extractors need; the rest of a huge page is not worth reading
+            logger.info(f"Stopped reading {response.url} after {size} bytes")
+            break
+    return b"".join(chunks)[:max_bytes]
+
+
+def _retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    value = headers.get("Retry-After", "")
+    return float(value) if value.isdigit() else None
+
+
+def _is_site_failure(status: int) -> bool:
+    # Server errors, blocking and rate limiting concern the whole site, while
+    # other 4xx statuses (404, 410, ...) only concern the page
+    return status >= 500 or status in (403, 429)
+
+
+def _failure_reason(error: Exception) -> str:
+    if isinstance(error, asyncio.TimeoutError):
+        return "timed out"
+    if isinstance(getattr(error, "os_error", None), socket.gaierror):
+        return "DNS lookup failed"
+    return f"connection failed: {error}"
+
+
+def _cache_lookup(url: str, domain: str, max_bytes: int) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    The cached copy of ``url`` and, unless it is fresh, the recent failure of
+    ``domain``. Like the other ``_cache_*`` helpers it runs in a thread, as
+    the cache's SQLite writes can wait up to the busy timeout for other
+    processes and would stall every fetch on the event loop.
+    """
+    cached = http_cache.get(url)
+    if cached is not None:
+        cached["body"] = cached["body"][:max_bytes]
+        if cached["fresh"]:
+            http_cache.record("hits")
+            return cached, None
+    failure = http_cache.get_failure(domain)
+    if failure is not None:
+        http_cache.record("fast_failures")
+    return cached, failure
+
+
+def _cache_revalidated(url: str, domain: str, headers: Mapping[str, str]):
+    http_cache.record("revalidations")
+    http_cache.refresh(url, headers)
+    http_cache.clear_failure(domain)
+
+
+def _cache_fetched(url: str, domain: str, status: int, headers: Mapping[str, str], body: bytes, encoding: Optional[str]):
+    http_cache.record("misses")
+    http_cache.clear_failure(domain)
+    if status == 200:
+        http_cache.store(url, status, headers, body, encoding)
+
+
+async def fetch_text(
+    url: str,
+    primary: bool = False,
+    max_bytes: Optional[int] = None,
+    content_types: Tuple[str, ...] = HTML_CONTENT_TYPES,
+) -> str:
+    """
+    Fetch ``url`` through the shared session and return the decoded body.
+
+    Fresh cached pages are returned without a request; stale ones are
+    revalidated with ``If-None-Match`` / ``If-Modified-Since`` so an
+    unchanged page costs a ``304``.
+
+    DNS failures and refused connections mark the domain as failing, as do
+    timeouts, server errors, ``403`` and ``429`` for ``primary`` URLs (the
+    page standing for the whole site). Until its retry time, requests to a failing domain raise
+    ``DomainUnavailableError`` at once, or return a stale cached copy if
+    there is one. Error statuses raise ``aiohttp.ClientResponseError``.
+
+    Requests are paced per host and limited globally by ``request_slot``;
+    ``429`` and ``503`` answers hold back further requests to the host.
+
+    Bodies are streamed and cut off after ``max_bytes`` (default
+    ``HTTP_MAX_PAGE_BYTES``); responses declared as something other than
+    ``content_types`` (HTML by default) raise ``UnsupportedContentError``
+    without reading the body.
+    """
+    max_bytes = max_bytes or settings.HTTP_MAX_PAGE_BYTES
+    parsed = urlparse(url)
+    domain = f"{parsed.hostname}:{parsed.port}" if parsed.port else (parsed.hostname or "")
+    cached = failure = None
+    if http_cache is not None:
+        cached, failure = await asyncio.to_thread(_cache_lookup, url, domain, max_bytes)
+    if cached is not None and cached["fresh"]:
+        return _decode(cached["body"], cached["encoding"])
+    
+    if failure is not None:
+        if cached is not None:
+            return _decode(cached["body"], cached["encoding"])
+        raise DomainUnavailableError(
+            f"{domain} is unavailable ({failure['reason']}), "
+            f"retrying in {failure['retry_at'] - time.time():.0f}s"
+        )
+    
+    headers = {}
+    if cached is not None:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+    
+    session = get_session()
+    try:
+        async with request_slot(url, domain, session), session.get(url, headers=headers) as response:
+            if response.status == 304 and cached is not None:
+                await asyncio.to_thread(_cache_revalidated, url, domain, response.headers)
+                return _decode(cached["body"], cached["encoding"])
+            if response.status >= 400:
+                if response.status in (429, 503):
+                    pause_host(domain, _retry_after(response.headers))
+                if primary and http_cache is not None and _is_site_failure(response.status):
+                    await asyncio.to_thread(
+                        http_cache.record_failure, domain, f"HTTP {response.status}", _retry_after(response.headers)
+                    )
+                response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "")
+            mimetype = content_type.split(";", 1)[0].strip().lower()
+            if mimetype and mimetype not in content_types:
+                raise UnsupportedContentError(f"{url} is not {' or '.join(content_types)} ({mimetype})")
+            body = await _read_capped(response, max_bytes)
+            encoding = _charset(content_type, body)
+    except (aiohttp.ClientConnectorError, asyncio.TimeoutError) as e:
+        # DNS failures and refused connections concern the whole host, while
+        # a timeout may only mean one slow page
+        if http_cache is not None and (primary or isinstance(e, aiohttp.ClientConnectorError)):
+            await asyncio.to_thread(http_cache.record_failure, domain, _failure_reason(e))
+        raise
+    
+    if http_cache is not None:
+        await asyncio.to_thread(_cache_fetched, url, domain, response.status, response.headers, body, encoding)
+    return _decode(body, encoding)
+
+
+async def gather_limited(aws: Iterable[Awaitable[T]], limit: Optional[int] = None) -> List[Union[T, BaseException]]:
+    """
+    Await ``aws`` concurrently, at most ``limit`` (default
+    ``HTTP_SITE_CONCURRENCY``) at a time, and return their results in order.
+    Exceptions are returned in place of results rather than raised.
+
+    Used for the secondary pages of a site so they take about as long as the
+    slowest one instead of their sum, without flooding the site.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit or settings.HTTP_SITE_CONCURRENCY))
+    
+    async def run(aw: Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
+    
+    return await asyncio.gather(*(run(aw) for aw in aws), return_exceptions=True)
@@ -0,0 +1,144 @@
+# app/utils/link_ranker.py
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+# Candidate pages returned per kind
+MAX_CANDIDATES = 3
+
+# Per kind: anchor texts that name the page outright, words that suggest
+# it, and URL path segments ("slugs") used for it
+_KINDS: Dict[str, Dict[str, re.Pattern]] = {
+    "about": {
+        "exact_text": re.compile(
+            r'(about|about us|about the company|who we are|our story|our company|company|the company)', re.I
+        ),
+        "text": re.compile(r'\b(about|who we are|our story|our company|company)\b', re.I),
+        "slug": re.compile(r'(about|about-us|aboutus|about_us|who-we-are|our-story|company|the-company)', re.I),
+        "path": re.compile(r'about|company|who-we-are|our-story', re.I),
+        # Anything the patterns above can match, to skip other links early
+        "any": re.compile(r'about|company|who\s+we\s+are|our\s+story|who-we-are|our-story', re.I),
+    },
+    "contact": {
+        "exact_text": re.compile(
+            r'(contact|contact us|contacts|get in touch|reach us|talk to us|write to us|kontakt|contacto)', re.I
+        ),
+        "text": re.compile(r'\b(contact|get in touch|reach us|talk to us|kontakt|contacto)\b', re.I),
+        "slug": re.compile(r'(contact|contact-us|contactus|contact_us|contacts|get-in-touch|kontakt|contacto)', re.I),
+        "path": re.compile(r'contact|get-in-touch|kontakt', re.I),
+        "any": re.compile(r'contact|get\s+in\s+touch|reach\s+us|talk\s+to\s+us|write\s+to\s+us|get-in-touch|kontakt', re.I),
+    },
+    "team": {
+        "exact_text": re.compile(
+            r'(team|our team|the team|meet the team|people|our people|leadership|management|staff|founders)', re.I
+        ),
+        "text": re.compile(r'\b(team|our people|leadership|management|staff|founders)\b', re.I),
+        "slug": re.compile(r'(team|our-team|the-team|meet-the-team|people|our-people|leadership|management|staff)', re.I),
+        "path": re.compile(r'team|people|leadership|management|staff', re.I),
+        "any": re.compile(r'team|people|leadership|management|staff|founders', re.I),
+    },
+}
+
+# Path segments of posts and listings that merely mention the company or
+# contact details, e.g. /blog/2023/05/company-news
+_NOISE_SEGMENTS = frozenset([
+    'blog', 'blogs', 'news', 'post', 'posts', 'article', 'articles', 'press', 'media', 'events',
+    'tag', 'tags', 'category', 'categories', 'author', 'careers', 'jobs', 'shop', 'product', 'products',
+])
+_YEAR_SEGMENT = re.compile(r'(19|20)\d\d')
+_PAGE_SUFFIX = re.compile(r'\.(html?|php|aspx?|jsp)$', re.I)
+# Links to files rather than pages
+_FILE_SUFFIX = re.compile(r'\.(pdf|jpe?g|png|gif|svg|webp|zip|docx?|xlsx?|pptx?|mp4|mp3)$', re.I)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _site(host: str) -> str:
+    return host[4:] if host.startswith('www.') else host
+
+
+def score_link(url: str, text: str, kind: str, base_url: str) -> Optional[int]:
+    """
+    Score how likely ``url``, linked as ``text`` from ``base_url``, is the
+    site's ``kind`` page ("about", "contact" or "team"). Returns None for links that
+    are not candidates: other sites, files, non-HTTP links, links whose text
+    and path say nothing about ``kind`` and deep links into blogs and news.
+    """
+    return _score(url, text, _KINDS[kind], _site(urlparse(base_url).hostname or ''))
+
+
+def _score(url: str, text: str, patterns: Dict[str, re.Pattern], base_host: str) -> Optional[int]:
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or _FILE_SUFFIX.search(parsed.path):
+        return None
+
+    host = _site(parsed.hostname or '')
+    if host == base_host:
+        score = 3
+    elif host.endswith(f'.{base_host}') or base_host.endswith(f'.{host}'):
+        score = 1
+    else:
+        return None
+
+    text = _WHITESPACE.sub(' ', text).strip(' \t\n|>»›·-–—:').lower()
+    matched = False
+    if text and patterns["exact_text"].fullmatch(text):
+        score += 6
+        matched = True
+    elif text and patterns["text"].search(text):
+        # Long texts such as headlines mention the word in passing
+        score += 3 if len(text) <= 30 else 1
+        matched = True
+
+    segments = [segment for segment in parsed.path.split('/') if segment]
+    if segments:
+        slug = _PAGE_SUFFIX.sub('', segments[-1])
+        if patterns["slug"].fullmatch(slug):
+            score += 5
+            matched = True
+        elif patterns["path"].search(parsed.path):
+            score += 2
+            matched = True
+    if not matched:
+        return None
+
+    score -= max(0, len(segments) - 1)
+    if any(segment.lower() in _NOISE_SEGMENTS or _YEAR_SEGMENT.fullmatch(segment) for segment in segments[:-1]):
+        score -= 4
+    if parsed.query:
+        score -= 1
+    return score if score > 0 else None
+
+
+def rank_links(
+    links: Iterable[Tuple[str, str]],
+    base_url: str,
+    kind: str,
+    limit: int = MAX_CANDIDATES,
+) -> List[str]:
+    """
+    Rank ``(href, anchor text)`` pairs found on ``base_url`` as candidates
+    for the site's ``kind`` page and return up to ``limit`` absolute URLs,
+    best first. Equal scores keep page order; links back to ``base_url``
+    itself are skipped.
+    """
+    patterns = _KINDS[kind]
+    loose = patterns["any"]
+    base = urljoin(base_url, '').split('#', 1)[0]
+    base_host = _site(urlparse(base_url).hostname or '')
+    scored: Dict[str, Tuple[int, int]] = {}
+    for position, (href, text) in enumerate(links):
+        text = text or ''
+        if not href or not (loose.search(href) or loose.search(text)):
+            continue
+        url = urljoin(base_url, href.strip()).split('#', 1)[0]
+        if url == base or url.rstrip('/') == base.rstrip('/'):
+            continue
+        score = _score(url, text, patterns, base_host)
+        if score is None:
+            continue
+        # The same page linked twice counts with its best text
+        best = scored.get(url)
+        if best is None or score > best[0]:
+            scored[url] = (score, best[1] if best is not None else position)
+    ranked = sorted(scored.items(), key=lambda item: (-item[1][0], item[1][1]))
+    return [url for url, _ in ranked[:limit]]
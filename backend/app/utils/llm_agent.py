@@ -1,38 +1,187 @@
 # app/utils/llm_agent.py
-import aiohttp
 from bs4 import BeautifulSoup
-from typing import Dict, List, Optional, Any
-import re
+from typing import Dict, List, Optional, Any, Tuple
+import asyncio
 import logging
 import json
+from datetime import datetime, timedelta
 from urllib.parse import urljoin, urlparse
 from openai import AsyncAzureOpenAI
 
 
-from app.utils.task_queue import update_task_progress
+from app.utils.task_queue import PRIORITY_BACKGROUND, add_periodic_job, add_task, update_task_progress
+from app.utils.http_client import fetch_text, gather_limited
+from app.utils.contact_extractor import extract_contacts, scan_contact_links
+from app.utils.parse_pool import extract_page
+from app.db.session import SessionLocal
+import app.crud.target_profile as crud_target_profile
 from app.config import settings
 
-from .web_scraper import extract_business_areas,extract_company_description, extract_company_name, find_about_page_url, find_contact_page_url
+from .web_scraper import add_sitemap_candidates, normalize_domain
 
 logger = logging.getLogger(__name__)
 
 
+class TargetUnavailableError(Exception):
+    """The target website could not be fetched, so there is nothing to personalize from."""
+
+
+def load_target_profile(domain: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the saved profile of a domain as ``{"target_info", "contact_info",
+    "stale"}`` and count the request, or None if there is none usable.
+
+    Profiles are fresh for TARGET_PROFILE_MAX_AGE_SECONDS and are then still
+    served, marked stale, for TARGET_PROFILE_STALE_SECONDS.
+    """
+    db = SessionLocal()
+    try:
+        profile = crud_target_profile.get_by_domain(db, domain)
+        if not profile or not profile.scraped_at:
+            return None
+        now = datetime.utcnow()
+        max_age = timedelta(seconds=settings.TARGET_PROFILE_MAX_AGE_SECONDS)
+        max_stale_age = max_age + timedelta(seconds=settings.TARGET_PROFILE_STALE_SECONDS)
+        age = now - profile.scraped_at.replace(tzinfo=None)
+        if age > max_stale_age:
+            return None
+        contact_age = (
+            now - profile.contact_scraped_at.replace(tzinfo=None) if profile.contact_scraped_at else None
+        )
+        contact_usable = contact_age is not None and contact_age <= max_stale_age
+        crud_target_profile.record_request(db, profile)
+        return {
+            "target_info": {
+                "name": profile.name,
+                "description": profile.description or "",
+                "business_areas": profile.business_areas or [],
+                "contact_url": profile.contact_url
+            },
+            "contact_info": profile.contact_info if contact_usable else None,
+            "stale": age > max_age or (contact_usable and contact_age > max_age)
+        }
+    except Exception as e:
+        logger.error(f"Error loading target profile for {domain}: {str(e)}")
+        return None
+    finally:
+        db.close()
+
+def save_target_profile(domain: str, url: Optional[str] = None, target_info: Optional[Dict[str, Any]] = None, contact_info: Optional[Dict[str, Any]] = None):
+    """Store scraped website and/or contact information for a domain."""
+    db = SessionLocal()
+    try:
+        if target_info is not None:
+            crud_target_profile.save_website_info(db, domain=domain, url=url, target_info=target_info)
+        if contact_info is not None:
+            crud_target_profile.save_contact_info(db, domain=domain, contact_info=contact_info)
+    except Exception as e:
+        logger.error(f"Error saving target profile for {domain}: {str(e)}")
+    finally:
+        db.close()
+
+def queue_profile_refresh(domain: str, url: str) -> str:
+    """Queue a background re-scrape of a domain unless one is already queued."""
+    return add_task(
+        refresh_target_profile,
+        {"url": url},
+        priority=PRIORITY_BACKGROUND,
+        dedup_key=f"target-profile:{domain}",
+    )
+
+async def refresh_target_profile(task_id: str, url: str) -> Dict[str, Any]:
+    """Re-scrape a website and update its saved profile."""
+    domain = normalize_domain(url)
+    had_contact_info = await asyncio.to_thread(_has_contact_info, domain)
+    pages = {} if had_contact_info else None
+    target_info = await analyze_website(url, task_id, pages)
+    if target_info.get("error"):
+        # Keep serving the old profile; the next stale hit will retry
+        return {"domain": domain, "refreshed": False, "error": target_info["error"]}
+    
+    await asyncio.to_thread(save_target_profile, domain, url=url, target_info=target_info)
+    if had_contact_info:
+        contact_info = await find_contact_information(url, target_info, task_id, pages)
+        if contact_info.get("found"):
+            await asyncio.to_thread(save_target_profile, domain, contact_info=contact_info)
+    
+    logger.info(f"Refreshed target profile for {domain}")
+    return {"domain": domain, "refreshed": True}
+
+def _has_contact_info(domain: str) -> bool:
+    db = SessionLocal()
+    try:
+        profile = crud_target_profile.get_by_domain(db, domain)
+        return profile is not None and profile.contact_info is not None
+    finally:
+        db.close()
+
+def schedule_profile_refreshes() -> int:
+    """
+    Queue refreshes of popular profiles that expire within
+    TARGET_PROFILE_REFRESH_AHEAD_SECONDS, so their requests keep hitting
+    fresh data. Returns how many profiles were considered.
+    """
+    now = datetime.utcnow()
+    max_age = timedelta(seconds=settings.TARGET_PROFILE_MAX_AGE_SECONDS)
+    db = SessionLocal()
+    try:
+        due = crud_target_profile.get_due_for_refresh(
+            db,
+            scraped_before=now - max_age + timedelta(seconds=settings.TARGET_PROFILE_REFRESH_AHEAD_SECONDS),
+            requested_after=now - max_age,
+            min_requests=settings.TARGET_PROFILE_REFRESH_MIN_REQUESTS,
+            limit=settings.TARGET_PROFILE_REFRESH_BATCH_SIZE,
+        )
+        targets = [(profile.domain, profile.url or f"https://{profile.domain}") for profile in due]
+    finally:
+        db.close()
+    
+    for domain, url in targets:
+        queue_profile_refresh(domain, url)
+    if targets:
+        logger.info(f"Scheduled refresh of {len(targets)} target profiles")
+    return len(targets)
+
 
 async def generate_email_with_agent(task_id, company_data, target_url, find_contact=False, tone="professional", personalization_level="medium", custom_instructions=None):
     """Generate an email using the LLM agent."""
     try:
         update_task_progress(task_id, 10, "Starting website analysis")
         
+        # Reuse what is already known about this domain, from any user
+        domain = normalize_domain(target_url)
+        profile = await asyncio.to_thread(load_target_profile, domain)
+        # Pages fetched while analyzing, so the contact search can reuse them
+        pages = {} if find_contact else None
+        
         # Step 1: Analyze the target website
-        target_info = await analyze_website(target_url, task_id)
-        update_task_progress(task_id, 40, "Website analyzed")
+        if profile:
+            target_info = profile["target_info"]
+            if profile["stale"]:
+                # Serve the stale profile now and refresh it off the critical path
+                await asyncio.to_thread(queue_profile_refresh, domain, target_url)
+            update_task_progress(task_id, 40, "Using saved website profile")
+        else:
+            target_info = await analyze_website(target_url, task_id, pages)
+            if target_info.get("error"):
+                # Fail the task rather than spend an LLM call on an empty profile
+                raise TargetUnavailableError(f"Could not fetch {target_url}: {target_info['error']}")
+            update_task_progress(task_id, 40, "Website analyzed")
+            await asyncio.to_thread(save_target_profile, domain, url=target_url, target_info=target_info)
         
         # Step 2: Find contact information if requested
         contact_info = None
         if find_contact:
-            update_task_progress(task_id, 45, "Searching for contact information")
-            contact_info = await find_contact_information(target_url, target_info, task_id)
-            update_task_progress(task_id, 60, "Contact search completed")
+            if profile and profile["contact_info"]:
+                contact_info = profile["contact_info"]
+                update_task_progress(task_id, 60, "Using saved contact information")
+            else:
+                update_task_progress(task_id, 45, "Searching for contact information")
+                contact_info = await find_contact_information(target_url, target_info, task_id, pages)
+                update_task_progress(task_id, 60, "Contact search completed")
+                # Only keep hits; a miss may be a transient fetch error
+                if contact_info.get("found"):
+                    await asyncio.to_thread(save_target_profile, domain, contact_info=contact_info)
         
         # Step 3: Generate the email
         update_task_progress(task_id, 70, "Generating email content")
@@ -55,6 +204,9 @@ async def generate_email_with_agent(task_id, company_data, target_url, find_cont
             "contact_info": contact_info,
             "target_url": target_url
         }
+    except TargetUnavailableError as e:
+        logger.info(str(e))
+        raise
     except Exception as e:
         import traceback
         logger.error(f"Error in generate_email_with_agent: {str(e)}")
@@ -70,47 +222,15 @@ async def generate_email_with_agent(task_id, company_data, target_url, find_cont
 
 def extract_emails(soup: BeautifulSoup) -> List[str]:
     """Extract email addresses from the HTML."""
-    # Look for email addresses in the text
-    text = soup.get_text()
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    emails = re.findall(email_pattern, text)
-    
-    # Also check for mailto links
+    # Look for email addresses in the text, then in mailto links
     mailto_links = soup.select('a[href^="mailto:"]')
-    for link in mailto_links:
-        href = link.get('href', '')
-        email = href.replace('mailto:', '').split('?')[0].strip()
-        if email and email not in emails:
-            emails.append(email)
-    
-    return emails
+    return extract_contacts(soup.get_text(), mailto_hrefs=[link.get('href', '') for link in mailto_links])["emails"]
 
 def extract_phone_numbers(soup: BeautifulSoup) -> List[str]:
     """Extract phone numbers from the HTML."""
-    # Look for phone numbers in the text
-    text = soup.get_text()
-    # Simple pattern for international phone numbers
-    phone_pattern = r'(\+\d{1,3}[-.\s]?)?(\(?\d{3}\)?[-.\s]?)?\d{3}[-.\s]?\d{4}'
-    phones = re.findall(phone_pattern, text)
-    
-    # Clean up and format the phone numbers
-    formatted_phones = []
-    for phone_parts in phones:
-        phone = ''.join(phone_parts).strip()
-        if phone:
-            # Remove duplicate symbols and spaces
-            phone = re.sub(r'[-.\s]+', '-', phone)
-            formatted_phones.append(phone)
-    
-    # Also check for tel: links
+    # Look for phone numbers in the text, then in tel links
     tel_links = soup.select('a[href^="tel:"]')
-    for link in tel_links:
-        href = link.get('href', '')
-        phone = href.replace('tel:', '').strip()
-        if phone and phone not in formatted_phones:
-            formatted_phones.append(phone)
-    
-    return formatted_phones
+    return extract_contacts(soup.get_text(), tel_hrefs=[link.get('href', '') for link in tel_links])["phones"]
 
 def extract_contact_person(soup: BeautifulSoup) -> Optional[Dict[str, str]]:
     """Extract information about a contact person."""
@@ -137,71 +257,116 @@ def extract_contact_person(soup: BeautifulSoup) -> Optional[Dict[str, str]]:
     
     return None
 
-async def analyze_website(url: str, task_id: str) -> Dict[str, Any]:
-    """Analyze a website to extract company information."""
+async def analyze_website(url: str, task_id: str, pages: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Analyze a website to extract company information.
+
+    Once the homepage is parsed, the about page is fetched concurrently with
+    the contact page if ``pages`` is given; fetched pages are stored in
+    ``pages`` by URL so ``find_contact_information`` does not fetch them again.
+    """
     update_task_progress(task_id, 15, "Fetching website content")
     
     # Fetch the main page
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url, timeout=30) as response:
-                html = await response.text()
-        except Exception as e:
-            logger.error(f"Error fetching URL {url}: {str(e)}")
-            update_task_progress(task_id, 20, f"Error fetching website: {str(e)}")
-            return {"name": "Unknown Company", "description": "", "business_areas": []}
-    
-    # Parse the HTML
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    # Extract company name
-    update_task_progress(task_id, 20, "Extracting company name")
-    company_name = extract_company_name(soup, url)
+    try:
+        html = await fetch_text(url, primary=True)
+    except Exception as e:
+        logger.error(f"Error fetching URL {url}: {str(e)}")
+        update_task_progress(task_id, 20, f"Error fetching website: {str(e)}")
+        return {"name": "Unknown Company", "description": "", "business_areas": [], "error": str(e)}
     
-    # Extract company description
-    update_task_progress(task_id, 25, "Extracting company description")
-    description = extract_company_description(soup)
+    if pages is not None:
+        # The contact search also looks at the homepage
+        pages[url] = html
     
-    # Extract business areas
-    update_task_progress(task_id, 30, "Identifying business areas")
-    business_areas = extract_business_areas(soup)
+    # Collect every signal of the page in one pass over the parsed HTML
+    update_task_progress(task_id, 20, "Extracting company information")
+    page = await extract_page(html, url)
+    page = await add_sitemap_candidates(page, url)
+    company_name = page["name"]
+    description = page["description"]
+    business_areas = page["business_areas"]
     
     # Check for about page and contact page
     update_task_progress(task_id, 35, "Looking for additional pages")
-    about_url = find_about_page_url(soup, url)
-    contact_url = find_contact_page_url(soup, url)
+    about_url = page["about_url"]
+    contact_url = page["contact_url"]
     
-    # Fetch about page if it exists
+    secondary_urls = []
     if about_url and about_url != url:
-        update_task_progress(task_id, 37, "Analyzing about page")
-        try:
-            async with session.get(about_url, timeout=30) as response:
-                about_html = await response.text()
-                about_soup = BeautifulSoup(about_html, 'html.parser')
-                
-                # Update description if the new one is better
-                about_description = extract_company_description(about_soup)
-                if len(about_description) > len(description):
-                    description = about_description
-                
-                # Add any new business areas
-                about_areas = extract_business_areas(about_soup)
-                for area in about_areas:
-                    if area not in business_areas:
-                        business_areas.append(area)
-        except Exception as e:
-            logger.error(f"Error fetching about URL {about_url}: {str(e)}")
+        secondary_urls.append(about_url)
+    if pages is not None and contact_url and contact_url != url and contact_url not in secondary_urls:
+        secondary_urls.append(contact_url)
+    
+    if secondary_urls:
+        update_task_progress(task_id, 37, "Fetching additional pages")
+        results = await gather_limited(fetch_text(page_url) for page_url in secondary_urls)
+        fetched = {}
+        for page_url, result in zip(secondary_urls, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error fetching URL {page_url}: {str(result)}")
+            else:
+                fetched[page_url] = result
+        if pages is not None:
+            pages.update(fetched)
+        
+        # Use the about page if it was fetched
+        if about_url in fetched:
+            about_page = await extract_page(fetched[about_url], about_url)
+            
+            # Update description if the new one is better
+            if len(about_page["description"]) > len(description):
+                description = about_page["description"]
+            
+            # Add any new business areas
+            for area in about_page["business_areas"]:
+                if area not in business_areas:
+                    business_areas.append(area)
     
     return {
         "name": company_name,
         "description": description,
         "business_areas": business_areas,
-        "contact_url": contact_url
+        "contact_url": contact_url,
+        "contact_urls": page["contact_urls"],
+        "team_urls": page["team_urls"]
     }
 
-async def find_contact_information(url: str, target_info: Dict[str, Any], task_id: str) -> Dict[str, Any]:
-    """Find contact information on the website."""
-    contact_url = target_info.get("contact_url", None)
+def _contact_candidates(url: str, target_info: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(page URL, kind) to search for contact information, best first."""
+    contact_urls = target_info.get("contact_urls") or [target_info.get("contact_url")]
+    candidates = [(page_url, "contact") for page_url in contact_urls]
+    # Footers often carry the general address
+    candidates.append((url, "home"))
+    candidates.extend((page_url, "team") for page_url in target_info.get("team_urls") or [])
+    seen = set()
+    unique = []
+    for page_url, kind in candidates:
+        if page_url and page_url not in seen:
+            seen.add(page_url)
+            unique.append((page_url, kind))
+    return unique[:settings.HTTP_CONTACT_SEARCH_MAX_PAGES]
+
+async def _search_page(page_url: str, kind: str, pages: Optional[Dict[str, str]]) -> Dict[str, Any]:
+    """Emails, phones and contact person of one candidate page."""
+    if pages and page_url in pages:
+        html = pages[page_url]
+    else:
+        html = await fetch_text(page_url)
+    if kind != "team":
+        # A mailto: link is enough here, and finding one needs no parse
+        links = scan_contact_links(html)
+        if links["emails"]:
+            return {"emails": links["emails"], "phones": links["phones"], "contact_person": None}
+    return await extract_page(html, page_url)
+
+async def find_contact_information(url: str, target_info: Dict[str, Any], task_id: str, pages: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Find contact information on the website: its contact pages, homepage
+    and team pages are searched concurrently, reusing pages prefetched by
+    ``analyze_website``. Once an email address is found the remaining pages
+    are cancelled; each detail is taken from the best candidate that has it.
+    """
     contact_info = {
         "email": None,
         "phone": None,
@@ -210,46 +375,57 @@ async def find_contact_information(url: str, target_info: Dict[str, Any], task_i
         "found": False
     }
     
-    # If no contact URL was found, we can't proceed
-    if not contact_url:
-        update_task_progress(task_id, 50, "No contact page found")
-        return contact_info
+    candidates = _contact_candidates(url, target_info)
+    update_task_progress(task_id, 50, f"Looking for email addresses, phone numbers and contact person on {len(candidates)} pages")
     
-    update_task_progress(task_id, 50, "Analyzing contact page")
+    results: List[Optional[Dict[str, Any]]] = [None] * len(candidates)
+    semaphore = asyncio.Semaphore(max(1, settings.HTTP_SITE_CONCURRENCY))
     
-    # Fetch the contact page
-    async with aiohttp.ClientSession() as session:
+    async def search(index: int) -> Tuple[int, Dict[str, Any]]:
+        async with semaphore:
+            page_url, kind = candidates[index]
+            return index, await _search_page(page_url, kind, pages)
+    
+    # Pages already fetched cost no request, so they are searched first
+    prefetched = [index for index, (page_url, _) in enumerate(candidates) if pages and page_url in pages]
+    remaining = [index for index in range(len(candidates)) if index not in prefetched]
+    for batch in (prefetched, remaining):
+        if not batch or any(result and result["emails"] for result in results):
+            continue
+        searches = [asyncio.ensure_future(search(index)) for index in batch]
+        pending = set(searches)
         try:
-            async with session.get(contact_url, timeout=30) as response:
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # Look for email addresses
-                update_task_progress(task_id, 52, "Looking for email addresses")
-                emails = extract_emails(soup)
-                if emails:
-                    contact_info["email"] = emails[0]  # Take the first email
-                    contact_info["found"] = True
-                
-                # Look for phone numbers
-                update_task_progress(task_id, 54, "Looking for phone numbers")
-                phones = extract_phone_numbers(soup)
-                if phones:
-                    contact_info["phone"] = phones[0]  # Take the first phone
-                    contact_info["found"] = True
-                
-                # Look for contact person information
-                update_task_progress(task_id, 56, "Looking for contact person")
-                person_info = extract_contact_person(soup)
-                if person_info:
-                    contact_info["name"] = person_info.get("name")
-                    contact_info["position"] = person_info.get("position")
-                    contact_info["found"] = True
-                
-        except Exception as e:
-            logger.error(f"Error fetching contact URL {contact_url}: {str(e)}")
-            update_task_progress(task_id, 58, f"Error fetching contact page: {str(e)}")
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for search_task in done:
+                    try:
+                        index, result = search_task.result()
+                        results[index] = result
+                    except Exception as e:
+                        logger.error(f"Error searching {url} for contact information: {str(e)}")
+                if any(result and result["emails"] for result in results):
+                    if pending:
+                        logger.info(f"Found an email address, skipping {len(pending)} more pages of {url}")
+                    break
+        finally:
+            for search_task in pending:
+                search_task.cancel()
+    
+    for result in results:
+        if result is None:
+            continue
+        if contact_info["email"] is None and result["emails"]:
+            contact_info["email"] = result["emails"][0]  # Take the first email
+        if contact_info["phone"] is None and result["phones"]:
+            contact_info["phone"] = result["phones"][0]  # Take the first phone
+        person_info = result["contact_person"]
+        if contact_info["name"] is None and person_info:
+            contact_info["name"] = person_info.get("name")
+            contact_info["position"] = person_info.get("position")
+    contact_info["found"] = any(contact_info[field] for field in ("email", "phone", "name"))
     
+    if not contact_info["found"]:
+        update_task_progress(task_id, 58, "No contact information found")
     return contact_info
 
 
@@ -388,4 +564,7 @@ async def generate_email_content(
         return {
             "subject": f"Introduction from {company_data.get('name', 'Our Company')}",
             "body": f"[Error generating personalized email. Please try again later.]"
-        }
\ No newline at end of file
+        }
+
+
+add_periodic_job(schedule_profile_refreshes, settings.TARGET_PROFILE_REFRESH_INTERVAL_SECONDS)
@@ -0,0 +1,303 @@
+# app/utils/page_extractor.py
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+from app.utils.contact_extractor import extract_contacts
+from app.utils.link_ranker import rank_links
+
+_ABOUT_SECTION = re.compile(r'about', re.I)
+_SERVICE_SECTION = re.compile(r'service|product|solution', re.I)
+_LOGO = re.compile(r'logo', re.I)
+
+_HEADINGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+_CONTACT_SECTION_CLASSES = frozenset(['contact', 'team', 'staff', 'employee'])
+_NAME_CLASSES = frozenset(['name', 'contact-name'])
+_POSITION_CLASSES = frozenset(['position', 'title', 'job-title', 'role'])
+
+# Paragraphs taken from the main content when there is no about section
+_MAIN_PARAGRAPHS = 5
+
+
+def company_name_from_title(title: str) -> str:
+    """Strip the usual page suffixes (" - Home", " | Tagline", ...) from a title."""
+    company = re.sub(r' - Home.*$', '', title)
+    company = re.sub(r' \| .*$', '', company)
+    company = re.sub(r' – .*$', '', company)
+    return company.strip()
+
+
+def company_name_from_url(url: str) -> str:
+    domain = urlparse(url).netloc
+    domain = re.sub(r'^www\.', '', domain)
+    domain = re.sub(r'\.com$|\.org$|\.net$', '', domain)
+    return domain.title()
+
+
+def _matches(pattern: re.Pattern, value: Any) -> bool:
+    # Multi-valued attributes (class) match on any value, like BeautifulSoup
+    if value is None:
+        return False
+    return pattern.search(" ".join(value) if isinstance(value, list) else value) is not None
+
+
+def _classes(value: Any) -> frozenset:
+    if value is None:
+        return frozenset()
+    return frozenset(value if isinstance(value, list) else value.split())
+
+
+class _Text:
+    """Text of one element, collected while the walk is inside it."""
+    __slots__ = ("types", "parts")
+
+    def __init__(self, tag: Tag):
+        types = tag.interesting_string_types or Tag.MAIN_CONTENT_STRING_TYPES
+        self.types = {types} if isinstance(types, type) else types
+        self.parts: List[str] = []
+
+    def value(self) -> str:
+        return "".join(self.parts)
+
+
+class _Container:
+    """An element whose paragraphs, headings, list items or contact fields are collected."""
+    __slots__ = ("collect", "texts", "limit", "name", "position")
+
+    def __init__(self, collect: str, limit: Optional[int] = None):
+        self.collect = collect
+        self.texts: List[_Text] = []
+        self.limit = limit
+        self.name: Optional[_Text] = None
+        self.position: Optional[_Text] = None
+
+
+class _PageWalker:
+    """
+    Visits every node of the tree once, iteratively so deeply nested
+    malformed pages cannot hit the recursion limit, and records what the
+    extractors in ``web_scraper`` and ``llm_agent`` would find.
+    """
+
+    def __init__(self):
+        self.title: Optional[Tag] = None
+        self.site_name_meta: Optional[Tag] = None
+        self.logo: Optional[Tag] = None
+        self.description_meta: Optional[Tag] = None
+        self.about_candidates: List[Optional[_Container]] = [None, None, None]
+        self.main_candidates: List[Optional[_Container]] = [None, None, None]
+        self.service_sections_by_id: List[_Container] = []
+        self.service_sections_by_class: List[_Container] = []
+        self.service_lists: List[_Container] = []
+        self.contact_sections: List[_Container] = []
+        self.links: List[Tuple[str, _Text]] = []
+        self.mailto_hrefs: List[str] = []
+        self.tel_hrefs: List[str] = []
+        self.text: Optional[_Text] = None
+        self._texts: List[_Text] = []
+        self._containers: List[_Container] = []
+
+    def walk(self, soup: BeautifulSoup):
+        self.text = _Text(soup)
+        self._texts.append(self.text)
+        # Nodes still to visit, plus (texts, containers) markers that close
+        # what an element opened once its descendants have been visited
+        stack = list(reversed(soup.contents))
+        while stack:
+            node = stack.pop()
+            if type(node) is tuple:
+                texts, containers = node
+                del self._texts[len(self._texts) - texts:]
+                del self._containers[len(self._containers) - containers:]
+            elif isinstance(node, Tag):
+                opened = self._enter(node)
+                if opened != (0, 0):
+                    stack.append(opened)
+                stack.extend(reversed(node.contents))
+            elif isinstance(node, NavigableString):
+                node_type = type(node)
+                for text in self._texts:
+                    if node_type in text.types:
+                        text.parts.append(node)
+
+    def _enter(self, tag: Tag):
+        name = tag.name
+        attrs = tag.attrs
+        classes = _classes(attrs.get('class'))
+        capture: Optional[_Text] = None
+
+        # Collect for the open containers this element is a descendant of
+        for container in self._containers:
+            collect = container.collect
+            if collect == 'contact':
+                is_name = container.name is None and (name in _HEADINGS or not classes.isdisjoint(_NAME_CLASSES))
+                is_position = container.position is None and not classes.isdisjoint(_POSITION_CLASSES)
+                if not (is_name or is_position):
+                    continue
+                capture = capture or _Text(tag)
+                if is_name:
+                    container.name = capture
+                if is_position:
+                    container.position = capture
+            elif (
+                (collect == 'p' and name == 'p')
+                or (collect == 'headings' and name in _HEADINGS)
+                or (collect == 'li' and name == 'li')
+            ) and (container.limit is None or len(container.texts) < container.limit):
+                capture = capture or _Text(tag)
+                container.texts.append(capture)
+
+        # Open this element as a container for its descendants
+        opened = []
+        if name in ('section', 'div'):
+            element_id = attrs.get('id')
+            if _matches(_ABOUT_SECTION, element_id):
+                slot = 0 if name == 'section' else 1
+                if self.about_candidates[slot] is None:
+                    self.about_candidates[slot] = _Container('p')
+                    opened.append(self.about_candidates[slot])
+            if name == 'div' and self.about_candidates[2] is None and _matches(_ABOUT_SECTION, attrs.get('class')):
+                self.about_candidates[2] = _Container('p')
+                opened.append(self.about_candidates[2])
+            if name == 'div' and self.main_candidates[1] is None and element_id == 'content':
+                self.main_candidates[1] = _Container('p', _MAIN_PARAGRAPHS)
+                opened.append(self.main_candidates[1])
+            if _matches(_SERVICE_SECTION, element_id):
+                self.service_sections_by_id.append(_Container('headings'))
+                opened.append(self.service_sections_by_id[-1])
+            if _matches(_SERVICE_SECTION, attrs.get('class')):
+                self.service_sections_by_class.append(_Container('headings'))
+                opened.append(self.service_sections_by_class[-1])
+        elif name in ('main', 'body'):
+            slot = 0 if name == 'main' else 2
+            if self.main_candidates[slot] is None:
+                self.main_candidates[slot] = _Container('p', _MAIN_PARAGRAPHS)
+                opened.append(self.main_candidates[slot])
+        elif name in ('ul', 'ol') and _matches(_SERVICE_SECTION, attrs.get('class')):
+            self.service_lists.append(_Container('li'))
+            opened.append(self.service_lists[-1])
+        if not classes.isdisjoint(_CONTACT_SECTION_CLASSES):
+            self.contact_sections.append(_Container('contact'))
+            opened.append(self.contact_sections[-1])
+
+        # Elements of which only the first occurrence matters
+        if name == 'title':
+            self.title = self.title or tag
+        elif name == 'meta':
+            if self.site_name_meta is None and attrs.get('property') == 'og:site_name':
+                self.site_name_meta = tag
+            if self.description_meta is None and attrs.get('name') == 'description':
+                self.description_meta = tag
+        elif name == 'img':
+            if self.logo is None and _matches(_LOGO, attrs.get('class')):
+                self.logo = tag
+        elif name == 'a':
+            capture = self._enter_link(tag, capture)
+
+        self._containers.extend(opened)
+        if capture is not None:
+            self._texts.append(capture)
+        return (1 if capture is not None else 0), len(opened)
+
+    def _enter_link(self, tag: Tag, capture: Optional[_Text]) -> Optional[_Text]:
+        href = tag.attrs.get('href')
+        if not isinstance(href, str):
+            return capture
+        if href.startswith('mailto:'):
+            self.mailto_hrefs.append(href)
+        elif href.startswith('tel:'):
+            self.tel_hrefs.append(href)
+        else:
+            # The anchor text ranks the link as an about or contact page
+            capture = capture or _Text(tag)
+            self.links.append((href, capture))
+        return capture
+
+
+def _first(candidates: List[Optional[Any]]) -> Optional[Any]:
+    return next((candidate for candidate in candidates if candidate is not None), None)
+
+
+def summarize_page(soup: BeautifulSoup, url: str) -> Dict[str, Any]:
+    """
+    Extract every company and contact signal of a parsed page in a single
+    traversal of the tree.
+
+    Returns ``{"name", "description", "business_areas", "about_url",
+    "about_urls", "contact_url", "contact_urls", "team_urls", "emails",
+    "phones", "contact_person"}``, where the ``*_urls`` are ranked candidate
+    pages, best first. The other values are the same
+    as ``extract_company_name``, ``extract_company_description``,
+    ``extract_business_areas``, ``find_about_page_url``,
+    ``find_contact_page_url``, ``extract_emails``, ``extract_phone_numbers``
+    and ``extract_contact_person``, which each walk the tree on their own.
+    """
+    walker = _PageWalker()
+    walker.walk(soup)
+
+    title = walker.title.string if walker.title is not None else ""
+    if title:
+        name = company_name_from_title(title)
+    elif walker.site_name_meta is not None and walker.site_name_meta.get('content'):
+        name = walker.site_name_meta.get('content')
+    elif walker.logo is not None and walker.logo.get('alt'):
+        name = walker.logo.get('alt')
+    else:
+        name = company_name_from_url(url)
+
+    description = ""
+    about_section = _first(walker.about_candidates)
+    main_content = _first(walker.main_candidates)
+    if walker.description_meta is not None and walker.description_meta.get('content'):
+        description = walker.description_meta.get('content')
+    elif about_section is not None and about_section.texts:
+        description = " ".join(text.value().strip() for text in about_section.texts)
+    elif main_content is not None and main_content.texts:
+        description = " ".join(text.value().strip() for text in main_content.texts)
+
+    business_areas = []
+    for section in walker.service_sections_by_id or walker.service_sections_by_class:
+        business_areas.extend(text.value().strip() for text in section.texts if text.value().strip())
+    if not business_areas:
+        for service_list in walker.service_lists:
+            business_areas.extend(text.value().strip() for text in service_list.texts if text.value().strip())
+
+    contact_person = None
+    for section in walker.contact_sections:
+        if section.name is not None:
+            contact_person = {
+                "name": section.name.value().strip(),
+                "position": section.position.value().strip() if section.position is not None else None
+            }
+            break
+
+    links = [(href, text.value()) for href, text in walker.links]
+    about_urls = rank_links(links, url, "about")
+    contact_urls = rank_links(links, url, "contact")
+    team_urls = rank_links(links, url, "team")
+    contacts = extract_contacts(walker.text.value(), walker.mailto_hrefs, walker.tel_hrefs)
+    return {
+        "name": name,
+        "description": description,
+        "business_areas": business_areas[:10],
+        "about_url": about_urls[0] if about_urls else None,
+        "about_urls": about_urls,
+        "contact_url": contact_urls[0] if contact_urls else None,
+        "contact_urls": contact_urls,
+        "team_urls": team_urls,
+        "emails": contacts["emails"],
+        "phones": contacts["phones"],
+        "contact_person": contact_person,
+    }
+
+
+def summarize_html(html: str, url: str, parser: str) -> Dict[str, Any]:
+    """
+    Parse ``html`` with ``parser`` and return ``summarize_page`` of it.
+
+    Module level and free of settings so it can run in a parse process; the
+    result holds plain strings only, which pickle without the tree.
+    """
+    return summarize_page(BeautifulSoup(html, parser), url)
@@ -0,0 +1,74 @@
+# app/utils/parse_pool.py
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.utils.html_parser import get_parser_name
+from app.utils.page_extractor import summarize_html
+
+logger = logging.getLogger(__name__)
+
+# Created on first use; shared by the API server loop and the embedded
+# worker pool loop, which run in different threads
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawned rather than forked: the parent runs event loops and
+            # threads that must not be copied into the children
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.HTML_PARSE_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Started HTML parse pool with {settings.HTML_PARSE_PROCESSES} processes")
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor):
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_parse_pool():
+    """Stop the parse processes, if they were started, once in-flight pages are done."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+async def extract_page(html: str, url: str) -> Dict[str, Any]:
+    """
+    Parse a page and return its ``summarize_page`` signals.
+
+    With HTML_PARSE_PROCESSES set, pages of at least HTML_PARSE_POOL_MIN_BYTES
+    are parsed in a process pool so the event loop keeps serving other
+    fetches and LLM calls; only the HTML and the small result dict cross the
+    process boundary. Smaller pages, and all pages when the pool is disabled,
+    are parsed inline.
+    """
+    parser = get_parser_name()
+    if settings.HTML_PARSE_PROCESSES <= 0 or len(html) < settings.HTML_PARSE_POOL_MIN_BYTES:
+        return summarize_html(html, url, parser)
+
+    executor = _get_executor()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, summarize_html, html, url, parser)
+    except BrokenProcessPool:
+        # A parse process died (e.g. killed for memory); start a new pool next time
+        logger.error(f"HTML parse pool broke while parsing {url}, parsing inline")
+        _discard_executor(executor)
+        return summarize_html(html, url, parser)
@@ -3,11 +3,12 @@ from typing import Any, Optional, Union
 
 from jose import jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
 from app.config import settings
+from app.db.base import SessionLocal
 from app.db.session import get_db
 from app.models.user import User
 
@@ -31,6 +32,21 @@ def create_access_token(subject: Union[str, Any], expires_delta: Optional[timede
     return encoded_jwt
 
 def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+    return authenticate_token(db, token)
+
+def get_current_user_from_query(token: str = Query(..., description="Access token")) -> User:
+    """
+    Authenticate with a token passed as a query parameter, for clients such as
+    EventSource that cannot send an Authorization header. The database session
+    is closed before returning so long-lived responses do not hold it.
+    """
+    db = SessionLocal()
+    try:
+        return authenticate_token(db, token)
+    finally:
+        db.close()
+
+def authenticate_token(db: Session, token: str) -> User:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
         user_id: int = int(payload["sub"])
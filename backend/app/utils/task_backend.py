@@ -0,0 +1,1045 @@
+# app/utils/task_backend.py
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.config import settings
+from app.utils.task_store import TaskStore
+
+logger = logging.getLogger(__name__)
+
+# Priority classes; queued tasks of a higher class are always claimed first
+PRIORITY_BACKGROUND = -10
+PRIORITY_BULK = 0
+PRIORITY_INTERACTIVE = 10
+
+# States a task never leaves once reached
+FINISHED_STATES = ("completed", "failed", "cancelled")
+
+
+class TaskBackend:
+    """
+    Queue and result storage shared by API and worker processes.
+
+    Jobs are stored by name (``"module:function"``) with JSON-encoded
+    keyword arguments so any process can claim and run them. A backend must
+    make ``claim`` atomic: a queued task is handed to exactly one worker.
+
+    Within the highest priority class that has queued work, ``claim`` serves
+    owners round-robin and each owner's tasks in submission order, so one
+    large submission cannot starve other users.
+    Anything that can provide that guarantee (SQLite, a Redis-compatible
+    server using a list plus a hash per task, ...) can implement this
+    interface.
+
+    Every change to a task stamps it with a new, increasing version so that
+    clients can fetch only what changed since the last version they saw.
+    """
+
+    def enqueue(
+        self,
+        task_id: str,
+        name: str,
+        kwargs: Dict[str, Any],
+        owner_id: Optional[int] = None,
+        priority: int = PRIORITY_BULK,
+        dedup_key: Optional[str] = None,
+    ) -> str:
+        """
+        Store a new task in the ``queued`` state and return its id. With a
+        ``dedup_key`` matching a queued or running task of the same owner,
+        nothing is queued and that task's id is returned instead.
+        """
+        raise NotImplementedError
+
+    def enqueue_batch(
+        self,
+        batch_id: str,
+        name: str,
+        items: List[Dict[str, Any]],
+        owner_id: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        priority: int = PRIORITY_BULK,
+    ) -> List[str]:
+        """
+        Create a batch and queue one task per item in a single operation.
+
+        Each item is ``{"task_id", "url", "kwargs"}`` plus an optional
+        ``dedup_key``. An item whose key matches a queued or running task of
+        the same owner joins that task instead of queueing a new one, so both
+        batches share its progress and result. Returns the task id used for
+        each item, in order.
+        """
+        raise NotImplementedError
+
+    def get_batch(self, batch_id: str, include_results: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Return a batch with its task counts by state, aggregate progress and
+        the status of every item (with results if ``include_results``), or
+        None if it is unknown or expired.
+        """
+        raise NotImplementedError
+
+    def list_batches(self, owner_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return summaries of the most recent batches of ``owner_id``."""
+        raise NotImplementedError
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Atomically move the next queued task to ``running`` and return it as
+        ``{"task_id", "name", "kwargs"}``, or None if the queue is empty.
+        """
+        raise NotImplementedError
+
+    def update_progress(self, task_id: str, progress: int, message: str, worker_id: Optional[str] = None) -> bool:
+        """
+        Update the progress of a running task. With ``worker_id`` only the
+        worker holding the task may update it. Returns whether it was updated.
+        """
+        raise NotImplementedError
+
+    def finish(self, task_id: str, result: Dict[str, Any], worker_id: Optional[str] = None) -> bool:
+        """
+        Record the final ``{"status": "completed"|"failed"|"cancelled", ...}``
+        of a running task. With ``worker_id`` only the worker holding the task
+        may finish it, so a worker whose task was requeued or cancelled
+        meanwhile cannot overwrite it. Returns whether it was recorded.
+        """
+        raise NotImplementedError
+
+    def cancel(self, task_ids: List[str], owner_id: Optional[int] = None) -> Dict[str, List[str]]:
+        """
+        Cancel the given tasks, skipping those of other owners when
+        ``owner_id`` is given. Queued tasks are cancelled immediately; running
+        tasks are flagged and stopped by their worker (see
+        ``cancel_requested``). Returns ``{"cancelled": [...], "cancelling": [...]}``.
+        """
+        raise NotImplementedError
+
+    def cancel_requested(self, task_ids: List[str]) -> List[str]:
+        """Return which of the given running tasks have been asked to stop."""
+        raise NotImplementedError
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Return the status of a task, or None if it is unknown or expired."""
+        raise NotImplementedError
+
+    def get_many(
+        self, task_ids: List[str], since_version: int = 0, owner_id: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Return ``{task_id: status}`` for the given tasks that changed after
+        ``since_version``. Tasks of other owners are skipped when ``owner_id``
+        is given.
+        """
+        raise NotImplementedError
+
+    def get_changed(self, owner_id: int, since_version: int = 0, limit: int = 500) -> Dict[str, Dict[str, Any]]:
+        """
+        Return ``{task_id: status}`` for up to ``limit`` tasks of ``owner_id``
+        that changed after ``since_version``, oldest change first.
+        """
+        raise NotImplementedError
+
+    def get_batch_task_ids(self, batch_id: str) -> List[str]:
+        """Return the task ids of a batch in submission order."""
+        raise NotImplementedError
+
+    def requeue_stale(self, lease_seconds: int) -> int:
+        """Return running tasks that stopped reporting progress to the queue."""
+        raise NotImplementedError
+
+    def cleanup(self) -> int:
+        """Drop expired finished tasks and return how many were removed."""
+        raise NotImplementedError
+
+    def load(self, window_seconds: int) -> Dict[str, Any]:
+        """
+        Return the current queue depth and recent throughput: ``queued`` and
+        ``running`` counts, how many tasks ``finished`` (completed or failed)
+        in the last ``window_seconds`` and their ``avg_duration`` (None if
+        there were none).
+        """
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class MemoryTaskBackend(TaskBackend):
+    """
+    Process-local backend. Tasks are lost on restart and are only visible to
+    the process that created them, so it is only suitable for a single API
+    process running the embedded worker pool.
+    """
+
+    def __init__(self, ttl: int, max_entries: int, max_bytes: int):
+        self.store = TaskStore(ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+        # priority -> owner -> queued task ids; owners rotate to the end of
+        # their priority's OrderedDict each time one of their tasks is claimed
+        self._queues: Dict[int, "collections.OrderedDict[Optional[int], collections.deque]"] = {}
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        self._cancel_requested = set()
+        # (owner, dedup key) -> task id of unfinished tasks, and the reverse
+        self._inflight: Dict[tuple, str] = {}
+        self._inflight_keys: Dict[str, tuple] = {}
+        # Start times of running tasks and (finished_at, duration) of recent ones
+        self._started: Dict[str, float] = {}
+        self._recent = collections.deque(maxlen=10000)
+        self._lock = threading.Lock()
+
+    def enqueue(
+        self,
+        task_id: str,
+        name: str,
+        kwargs: Dict[str, Any],
+        owner_id: Optional[int] = None,
+        priority: int = PRIORITY_BULK,
+        dedup_key: Optional[str] = None,
+    ) -> str:
+        with self._lock:
+            return self._enqueue_unique(task_id, name, kwargs, owner_id, priority, dedup_key)
+
+    def _enqueue_unique(
+        self, task_id: str, name: str, kwargs: Dict[str, Any], owner_id: Optional[int], priority: int,
+        dedup_key: Optional[str],
+    ) -> str:
+        key = (owner_id, dedup_key) if dedup_key else None
+        existing = self._inflight.get(key) if key else None
+        if existing is not None and existing not in self._cancel_requested:
+            return existing
+        self._enqueue(task_id, name, kwargs, owner_id, priority)
+        if key:
+            self._inflight[key] = task_id
+            self._inflight_keys[task_id] = key
+        return task_id
+
+    def _enqueue(self, task_id: str, name: str, kwargs: Dict[str, Any], owner_id: Optional[int], priority: int):
+        self.store.create(task_id, owner_id=owner_id)
+        self._jobs[task_id] = {"task_id": task_id, "name": name, "kwargs": kwargs}
+        owners = self._queues.setdefault(priority, collections.OrderedDict())
+        owners.setdefault(owner_id, collections.deque()).append(task_id)
+
+    def enqueue_batch(
+        self,
+        batch_id: str,
+        name: str,
+        items: List[Dict[str, Any]],
+        owner_id: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        priority: int = PRIORITY_BULK,
+    ) -> List[str]:
+        task_ids = []
+        with self._lock:
+            for item in items:
+                task_ids.append(self._enqueue_unique(
+                    item["task_id"], name, item["kwargs"], owner_id, priority, item.get("dedup_key")
+                ))
+            self._batches[batch_id] = {
+                "owner_id": owner_id,
+                "metadata": metadata or {},
+                "created_at": time.time(),
+                "items": [(task_id, item["url"]) for task_id, item in zip(task_ids, items)],
+            }
+        return task_ids
+
+    def _forget_inflight(self, task_id: str):
+        key = self._inflight_keys.pop(task_id, None)
+        if key is not None and self._inflight.get(key) == task_id:
+            del self._inflight[key]
+
+    def get_batch(self, batch_id: str, include_results: bool = False) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            batch = self._batches.get(batch_id)
+        if batch is None:
+            return None
+        items = []
+        for task_id, url in batch["items"]:
+            status = self.store.get(task_id)
+            if status is not None:
+                items.append(_batch_item(task_id, url, status, include_results))
+        return _batch_summary(batch_id, batch["owner_id"], batch["created_at"], batch["metadata"], items)
+
+    def list_batches(self, owner_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            batch_ids = [
+                batch_id for batch_id, batch in sorted(
+                    self._batches.items(), key=lambda item: item[1]["created_at"], reverse=True
+                )
+                if batch["owner_id"] == owner_id
+            ][:limit]
+        batches = [self.get_batch(batch_id) for batch_id in batch_ids]
+        return [_without_items(batch) for batch in batches if batch is not None]
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = None
+            while job is None:
+                owners = next(
+                    (self._queues[priority] for priority in sorted(self._queues, reverse=True) if self._queues[priority]),
+                    None,
+                )
+                if owners is None:
+                    return None
+                owner_id, queued = next(iter(owners.items()))
+                task_id = queued.popleft()
+                if queued:
+                    owners.move_to_end(owner_id)
+                else:
+                    del owners[owner_id]
+                # Tasks cancelled while queued are already gone from _jobs and
+                # their ids are dropped here
+                job = self._jobs.pop(task_id, None)
+            self._started[job["task_id"]] = time.time()
+        self.store.mark_running(task_id)
+        return job
+
+    def update_progress(self, task_id: str, progress: int, message: str, worker_id: Optional[str] = None) -> bool:
+        # Running tasks never leave this process, so any worker holding one is its owner
+        return self.store.update_progress(task_id, progress, message)
+
+    def finish(self, task_id: str, result: Dict[str, Any], worker_id: Optional[str] = None) -> bool:
+        with self._lock:
+            started = self._started.pop(task_id, None)
+            if started is None:
+                return False
+            self.store.finish(task_id, result)
+            self._cancel_requested.discard(task_id)
+            self._forget_inflight(task_id)
+            if result["status"] != "cancelled":
+                now = time.time()
+                self._recent.append((now, now - started))
+        return True
+
+    def cancel(self, task_ids: List[str], owner_id: Optional[int] = None) -> Dict[str, List[str]]:
+        outcome = {"cancelled": [], "cancelling": []}
+        with self._lock:
+            statuses = self.store.get_many(task_ids, owner_id=owner_id)
+            for task_id, status in statuses.items():
+                if task_id in self._jobs:
+                    del self._jobs[task_id]
+                    self._forget_inflight(task_id)
+                    self.store.finish(task_id, {"status": "cancelled", "error": "Task cancelled"})
+                    outcome["cancelled"].append(task_id)
+                elif status["progress"]["status"] == "running":
+                    self._cancel_requested.add(task_id)
+                    self.store.update_progress(task_id, status["progress"]["progress"], "Cancelling")
+                    outcome["cancelling"].append(task_id)
+        return outcome
+
+    def cancel_requested(self, task_ids: List[str]) -> List[str]:
+        with self._lock:
+            return [task_id for task_id in task_ids if task_id in self._cancel_requested]
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(task_id)
+
+    def get_many(
+        self, task_ids: List[str], since_version: int = 0, owner_id: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        return self.store.get_many(task_ids, since_version=since_version, owner_id=owner_id)
+
+    def get_changed(self, owner_id: int, since_version: int = 0, limit: int = 500) -> Dict[str, Dict[str, Any]]:
+        return self.store.get_changed(owner_id, since_version=since_version, limit=limit)
+
+    def get_batch_task_ids(self, batch_id: str) -> List[str]:
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            return [task_id for task_id, _ in batch["items"]] if batch else []
+
+    def requeue_stale(self, lease_seconds: int) -> int:
+        # Running tasks live in this process, so they can never be orphaned
+        return 0
+
+    def cleanup(self) -> int:
+        removed = self.store.cleanup()
+        with self._lock:
+            # Forget batches whose tasks have all expired or been evicted
+            for batch_id, batch in list(self._batches.items()):
+                if not any(task_id in self.store for task_id, _ in batch["items"]):
+                    del self._batches[batch_id]
+        return removed
+
+    def load(self, window_seconds: int) -> Dict[str, Any]:
+        since = time.time() - window_seconds
+        with self._lock:
+            durations = [duration for finished_at, duration in self._recent if finished_at >= since]
+            return {
+                "queued": len(self._jobs),
+                "running": len(self._started),
+                "finished": len(durations),
+                "avg_duration": sum(durations) / len(durations) if durations else None,
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = len(self._jobs)
+        return {"backend": "memory", "queued": queued, **self.store.stats()}
+
+
+# Schema migrations for SQLiteTaskBackend, applied in order and tracked with
+# PRAGMA user_version. Each migration is a list of statements.
+_MIGRATIONS = [
+    [
+        """CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL,
+            progress INTEGER NOT NULL DEFAULT 0,
+            message TEXT NOT NULL DEFAULT '',
+            result TEXT,
+            error TEXT,
+            worker_id TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            updated_at REAL NOT NULL,
+            finished_at REAL,
+            expires_at REAL
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_status_created ON tasks (status, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_expires ON tasks (expires_at)",
+    ],
+    [
+        "ALTER TABLE tasks ADD COLUMN owner_id INTEGER",
+        "ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+        """CREATE TABLE batch_tasks (
+            batch_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            task_id TEXT NOT NULL,
+            url TEXT,
+            PRIMARY KEY (batch_id, position)
+        )""",
+        "CREATE INDEX ix_batch_tasks_task ON batch_tasks (task_id)",
+        "CREATE TABLE task_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        "INSERT INTO task_meta (key, value) VALUES ('version', 0)",
+        # Stamp every visible change with the next value of a global counter.
+        # A counter (rather than MAX(version)) keeps versions increasing even
+        # after the newest rows are deleted.
+        """CREATE TRIGGER tasks_version_insert AFTER INSERT ON tasks
+        BEGIN
+            UPDATE task_meta SET value = value + 1 WHERE key = 'version';
+            UPDATE tasks SET version = (SELECT value FROM task_meta WHERE key = 'version') WHERE id = NEW.id;
+        END""",
+        """CREATE TRIGGER tasks_version_update AFTER UPDATE OF status, progress, message, result, error ON tasks
+        BEGIN
+            UPDATE task_meta SET value = value + 1 WHERE key = 'version';
+            UPDATE tasks SET version = (SELECT value FROM task_meta WHERE key = 'version') WHERE id = NEW.id;
+        END""",
+    ],
+    [
+        "CREATE INDEX ix_tasks_owner_version ON tasks (owner_id, version)",
+    ],
+    [
+        """CREATE TABLE batches (
+            id TEXT PRIMARY KEY,
+            owner_id INTEGER,
+            metadata TEXT NOT NULL DEFAULT '{}',
+            created_at REAL NOT NULL
+        )""",
+        "CREATE INDEX ix_batches_owner_created ON batches (owner_id, created_at)",
+        # Batches created before this table existed only have batch_tasks rows
+        """INSERT INTO batches (id, owner_id, created_at)
+        SELECT b.batch_id, MIN(t.owner_id), MIN(t.created_at)
+        FROM batch_tasks b JOIN tasks t ON t.id = b.task_id GROUP BY b.batch_id""",
+    ],
+    [
+        "ALTER TABLE tasks ADD COLUMN priority INTEGER NOT NULL DEFAULT 0",
+        "CREATE INDEX ix_tasks_queue ON tasks (status, priority, owner_id, created_at)",
+        # Claim sequence number of the last task handed out per owner, used to
+        # rotate between owners (owner 0 stands for tasks without an owner)
+        """CREATE TABLE queue_owners (
+            owner_id INTEGER PRIMARY KEY,
+            served INTEGER NOT NULL
+        )""",
+    ],
+    [
+        "ALTER TABLE tasks ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0",
+    ],
+    [
+        "ALTER TABLE tasks ADD COLUMN dedup_key TEXT",
+        "CREATE INDEX ix_tasks_dedup ON tasks (dedup_key, owner_id) WHERE dedup_key IS NOT NULL",
+    ],
+    [
+        "CREATE INDEX ix_tasks_finished ON tasks (finished_at)",
+    ],
+    [
+        # Running totals for the storage budget, so finishing a task does not
+        # scan the whole table. Sizes are in bytes of the UTF-8 encoded text.
+        """INSERT INTO task_meta (key, value) SELECT 'entries', COUNT(*) FROM tasks""",
+        """INSERT INTO task_meta (key, value)
+        SELECT 'bytes', COALESCE(SUM(LENGTH(CAST(payload AS BLOB)) + COALESCE(LENGTH(CAST(result AS BLOB)), 0)), 0)
+        FROM tasks""",
+        """CREATE TRIGGER tasks_size_insert AFTER INSERT ON tasks
+        BEGIN
+            UPDATE task_meta SET value = value + 1 WHERE key = 'entries';
+            UPDATE task_meta SET value = value + LENGTH(CAST(NEW.payload AS BLOB))
+                + COALESCE(LENGTH(CAST(NEW.result AS BLOB)), 0) WHERE key = 'bytes';
+        END""",
+        """CREATE TRIGGER tasks_size_update AFTER UPDATE OF payload, result ON tasks
+        BEGIN
+            UPDATE task_meta SET value = value
+                + LENGTH(CAST(NEW.payload AS BLOB)) + COALESCE(LENGTH(CAST(NEW.result AS BLOB)), 0)
+                - LENGTH(CAST(OLD.payload AS BLOB)) - COALESCE(LENGTH(CAST(OLD.result AS BLOB)), 0)
+            WHERE key = 'bytes';
+        END""",
+        """CREATE TRIGGER tasks_size_delete AFTER DELETE ON tasks
+        BEGIN
+            UPDATE task_meta SET value = value - 1 WHERE key = 'entries';
+            UPDATE task_meta SET value = value - LENGTH(CAST(OLD.payload AS BLOB))
+                - COALESCE(LENGTH(CAST(OLD.result AS BLOB)), 0) WHERE key = 'bytes';
+        END""",
+    ],
+]
+
+# Stored size of a task row, as kept in task_meta by the triggers above
+_ROW_SIZE = "LENGTH(CAST(payload AS BLOB)) + COALESCE(LENGTH(CAST(result AS BLOB)), 0)"
+
+
+class SQLiteTaskBackend(TaskBackend):
+    """
+    Durable backend on a SQLite database in WAL mode.
+
+    Every API and worker process opens the same file, so task state is shared
+    across processes and survives restarts. Each thread gets its own
+    connection; claims run inside ``BEGIN IMMEDIATE`` so two workers can never
+    take the same task.
+    """
+
+    def __init__(self, path: str, ttl: int, max_entries: int, max_bytes: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._evictions = 0
+        self._expirations = 0
+        self._migrate()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        # Several processes may start at once; the write lock serializes them
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+            for version, statements in enumerate(_MIGRATIONS[current:], start=current + 1):
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def enqueue(
+        self,
+        task_id: str,
+        name: str,
+        kwargs: Dict[str, Any],
+        owner_id: Optional[int] = None,
+        priority: int = PRIORITY_BULK,
+        dedup_key: Optional[str] = None,
+    ) -> str:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            task_id = self._insert_unique(conn, task_id, name, kwargs, owner_id, priority, dedup_key, time.time())
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return task_id
+
+    @staticmethod
+    def _insert_unique(
+        conn: sqlite3.Connection, task_id: str, name: str, kwargs: Dict[str, Any], owner_id: Optional[int],
+        priority: int, dedup_key: Optional[str], now: float,
+    ) -> str:
+        if dedup_key:
+            # Rows inserted earlier in the same transaction are visible, so
+            # duplicates within one batch are merged as well
+            existing = conn.execute(
+                "SELECT id FROM tasks WHERE dedup_key = ? AND owner_id IS ? "
+                "AND status IN ('queued', 'running') AND cancel_requested = 0 LIMIT 1",
+                (dedup_key, owner_id),
+            ).fetchone()
+            if existing is not None:
+                return existing["id"]
+        conn.execute(
+            "INSERT INTO tasks (id, name, payload, status, message, owner_id, priority, dedup_key, "
+            "created_at, updated_at) VALUES (?, ?, ?, 'queued', 'Task queued', ?, ?, ?, ?, ?)",
+            (task_id, name, json.dumps(kwargs), owner_id, priority, dedup_key, now, now),
+        )
+        return task_id
+
+    def enqueue_batch(
+        self,
+        batch_id: str,
+        name: str,
+        items: List[Dict[str, Any]],
+        owner_id: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        priority: int = PRIORITY_BULK,
+    ) -> List[str]:
+        now = time.time()
+        task_ids = []
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO batches (id, owner_id, metadata, created_at) VALUES (?, ?, ?, ?)",
+                (batch_id, owner_id, json.dumps(metadata or {}), now),
+            )
+            for item in items:
+                task_ids.append(self._insert_unique(
+                    conn, item["task_id"], name, item["kwargs"], owner_id, priority, item.get("dedup_key"), now
+                ))
+            conn.executemany(
+                "INSERT INTO batch_tasks (batch_id, position, task_id, url) VALUES (?, ?, ?, ?)",
+                [
+                    (batch_id, position, task_id, item["url"])
+                    for position, (task_id, item) in enumerate(zip(task_ids, items))
+                ],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return task_ids
+
+    def get_batch(self, batch_id: str, include_results: bool = False) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        batch = conn.execute("SELECT * FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        if batch is None:
+            return None
+        columns = "t.*" if include_results else (
+            "t.id, t.status, t.progress, t.message, t.error, t.version, NULL AS result"
+        )
+        rows = conn.execute(
+            f"SELECT b.url, {columns} FROM batch_tasks b JOIN tasks t ON t.id = b.task_id "
+            "WHERE b.batch_id = ? AND (t.expires_at IS NULL OR t.expires_at > ?) ORDER BY b.position",
+            (batch_id, time.time()),
+        )
+        items = [
+            _batch_item(row["id"], row["url"], self._row_to_status(row), include_results)
+            for row in rows
+        ]
+        return _batch_summary(
+            batch_id, batch["owner_id"], batch["created_at"], json.loads(batch["metadata"]), items
+        )
+
+    def list_batches(self, owner_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        batches = conn.execute(
+            "SELECT * FROM batches WHERE owner_id = ? ORDER BY created_at DESC LIMIT ?", (owner_id, limit)
+        ).fetchall()
+        if not batches:
+            return []
+        # Aggregate every batch in one pass instead of loading its items
+        placeholders = ", ".join("?" * len(batches))
+        aggregates: Dict[str, Dict[str, Any]] = {}
+        for row in conn.execute(
+            "SELECT b.batch_id, t.status, COUNT(*) AS n, SUM(t.progress) AS progress "
+            f"FROM batch_tasks b JOIN tasks t ON t.id = b.task_id WHERE b.batch_id IN ({placeholders}) "
+            "AND (t.expires_at IS NULL OR t.expires_at > ?) GROUP BY b.batch_id, t.status",
+            [batch["id"] for batch in batches] + [time.time()],
+        ):
+            aggregate = aggregates.setdefault(row["batch_id"], {"counts": {}, "progress": 0})
+            aggregate["counts"][row["status"]] = row["n"]
+            aggregate["progress"] += row["progress"]
+        return [
+            _summarize(
+                batch["id"], batch["owner_id"], batch["created_at"], json.loads(batch["metadata"]),
+                aggregates.get(batch["id"], {}).get("counts", {}),
+                aggregates.get(batch["id"], {}).get("progress", 0),
+            )
+            for batch in batches
+        ]
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Highest priority first, then the owner served least recently
+            turn = conn.execute(
+                "SELECT q.owner_id, q.priority FROM ("
+                "  SELECT owner_id, MAX(priority) AS priority FROM tasks "
+                "  WHERE status = 'queued' GROUP BY owner_id"
+                ") q LEFT JOIN queue_owners o ON o.owner_id = COALESCE(q.owner_id, 0) "
+                "ORDER BY q.priority DESC, COALESCE(o.served, 0) LIMIT 1"
+            ).fetchone()
+            if turn is None:
+                conn.execute("COMMIT")
+                return None
+            row = conn.execute(
+                "SELECT id, name, payload FROM tasks WHERE status = 'queued' AND priority = ? "
+                "AND owner_id IS ? ORDER BY created_at LIMIT 1",
+                (turn["priority"], turn["owner_id"]),
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO queue_owners (owner_id, served) "
+                "SELECT ?, COALESCE(MAX(served), 0) + 1 FROM queue_owners",
+                (turn["owner_id"] or 0,),
+            )
+            conn.execute(
+                "UPDATE tasks SET status = 'running', worker_id = ?, progress = 0, "
+                "message = 'Task started', started_at = ?, updated_at = ? WHERE id = ?",
+                (worker_id, now, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {"task_id": row["id"], "name": row["name"], "kwargs": json.loads(row["payload"])}
+
+    def cancel(self, task_ids: List[str], owner_id: Optional[int] = None) -> Dict[str, List[str]]:
+        outcome = {"cancelled": [], "cancelling": []}
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for start in range(0, len(task_ids), 500):
+                chunk = task_ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                query = f"SELECT id, status FROM tasks WHERE id IN ({placeholders}) AND status IN ('queued', 'running')"
+                params = list(chunk)
+                if owner_id is not None:
+                    query += " AND owner_id = ?"
+                    params.append(owner_id)
+                for row in conn.execute(query, params).fetchall():
+                    outcome["cancelled" if row["status"] == "queued" else "cancelling"].append(row["id"])
+            conn.executemany(
+                "UPDATE tasks SET status = 'cancelled', progress = 100, message = 'Task cancelled', "
+                "error = 'Task cancelled', updated_at = ?, finished_at = ?, expires_at = ? WHERE id = ?",
+                [(now, now, now + self.ttl, task_id) for task_id in outcome["cancelled"]],
+            )
+            conn.executemany(
+                "UPDATE tasks SET cancel_requested = 1, message = 'Cancelling' WHERE id = ?",
+                [(task_id,) for task_id in outcome["cancelling"]],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return outcome
+
+    def cancel_requested(self, task_ids: List[str]) -> List[str]:
+        if not task_ids:
+            return []
+        placeholders = ", ".join("?" * len(task_ids))
+        rows = self._connect().execute(
+            f"SELECT id FROM tasks WHERE cancel_requested = 1 AND status = 'running' AND id IN ({placeholders})",
+            task_ids,
+        )
+        return [row["id"] for row in rows]
+
+    @staticmethod
+    def _held_by(worker_id: Optional[str]) -> Tuple[str, List[Any]]:
+        """WHERE clause matching a task that is running on ``worker_id``, if given."""
+        if worker_id is None:
+            return "status = 'running'", []
+        return "status = 'running' AND worker_id = ?", [worker_id]
+
+    def update_progress(self, task_id: str, progress: int, message: str, worker_id: Optional[str] = None) -> bool:
+        held, params = self._held_by(worker_id)
+        cursor = self._connect().execute(
+            f"UPDATE tasks SET progress = ?, message = ?, updated_at = ? WHERE id = ? AND {held}",
+            [progress, message, time.time(), task_id, *params],
+        )
+        return cursor.rowcount > 0
+
+    def finish(self, task_id: str, result: Dict[str, Any], worker_id: Optional[str] = None) -> bool:
+        now = time.time()
+        held, params = self._held_by(worker_id)
+        cursor = self._connect().execute(
+            "UPDATE tasks SET status = ?, progress = 100, result = ?, error = ?, "
+            f"updated_at = ?, finished_at = ?, expires_at = ? WHERE id = ? AND {held}",
+            [
+                result["status"],
+                json.dumps(result["result"], default=str) if "result" in result else None,
+                result.get("error"),
+                now, now, now + self.ttl,
+                task_id,
+                *params,
+            ],
+        )
+        if cursor.rowcount == 0:
+            return False
+        self._enforce_budget()
+        return True
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT * FROM tasks WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (task_id, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return self._row_to_status(row)
+
+    def get_many(
+        self, task_ids: List[str], since_version: int = 0, owner_id: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        if not task_ids:
+            return {}
+        conn = self._connect()
+        statuses = {}
+        # Stay well below SQLite's bound parameter limit
+        for start in range(0, len(task_ids), 500):
+            chunk = task_ids[start:start + 500]
+            query = (
+                f"SELECT * FROM tasks WHERE id IN ({', '.join('?' * len(chunk))}) "
+                "AND version > ? AND (expires_at IS NULL OR expires_at > ?)"
+            )
+            params = [*chunk, since_version, time.time()]
+            if owner_id is not None:
+                query += " AND owner_id = ?"
+                params.append(owner_id)
+            for row in conn.execute(query, params):
+                statuses[row["id"]] = self._row_to_status(row)
+        return statuses
+
+    def get_changed(self, owner_id: int, since_version: int = 0, limit: int = 500) -> Dict[str, Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT * FROM tasks WHERE owner_id = ? AND version > ? "
+            "AND (expires_at IS NULL OR expires_at > ?) ORDER BY version LIMIT ?",
+            (owner_id, since_version, time.time(), limit),
+        )
+        return {row["id"]: self._row_to_status(row) for row in rows}
+
+    def get_batch_task_ids(self, batch_id: str) -> List[str]:
+        rows = self._connect().execute(
+            "SELECT task_id FROM batch_tasks WHERE batch_id = ? ORDER BY position", (batch_id,)
+        )
+        return [row["task_id"] for row in rows]
+
+    @staticmethod
+    def _row_to_status(row: sqlite3.Row) -> Dict[str, Any]:
+        status = {"status": row["status"] if row["status"] in FINISHED_STATES else "pending"}
+        if row["result"] is not None:
+            status["result"] = json.loads(row["result"])
+        if row["error"] is not None:
+            status["error"] = row["error"]
+        status["progress"] = {
+            "status": row["status"],
+            "progress": row["progress"],
+            "message": row["message"]
+        }
+        status["version"] = row["version"]
+        return status
+
+    def requeue_stale(self, lease_seconds: int) -> int:
+        now = time.time()
+        conn = self._connect()
+        # Tasks that were asked to stop are not worth running again
+        conn.execute(
+            "UPDATE tasks SET status = 'cancelled', progress = 100, message = 'Task cancelled', "
+            "error = 'Task cancelled', updated_at = ?, finished_at = ?, expires_at = ? "
+            "WHERE status = 'running' AND cancel_requested = 1 AND updated_at < ?",
+            (now, now, now + self.ttl, now - lease_seconds),
+        )
+        cursor = conn.execute(
+            "UPDATE tasks SET status = 'queued', worker_id = NULL, progress = 0, "
+            "message = 'Task requeued', updated_at = ? WHERE status = 'running' AND updated_at < ?",
+            (now, now - lease_seconds),
+        )
+        if cursor.rowcount:
+            logger.warning(f"Requeued {cursor.rowcount} tasks from unresponsive workers")
+        return cursor.rowcount
+
+    def cleanup(self) -> int:
+        conn = self._connect()
+        cursor = conn.execute(
+            "DELETE FROM tasks WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+        self._expirations += cursor.rowcount
+        if cursor.rowcount:
+            logger.info(f"Removed {cursor.rowcount} expired tasks")
+            self._delete_orphaned_batch_tasks()
+        return cursor.rowcount
+
+    def _delete_orphaned_batch_tasks(self):
+        conn = self._connect()
+        conn.execute(
+            "DELETE FROM batch_tasks WHERE NOT EXISTS (SELECT 1 FROM tasks WHERE tasks.id = batch_tasks.task_id)"
+        )
+        conn.execute(
+            "DELETE FROM batches WHERE NOT EXISTS (SELECT 1 FROM batch_tasks WHERE batch_tasks.batch_id = batches.id)"
+        )
+
+    def _totals(self) -> Tuple[int, int]:
+        """Number of stored tasks and their size in bytes, kept up to date by triggers."""
+        totals = {
+            row["key"]: row["value"]
+            for row in self._connect().execute("SELECT key, value FROM task_meta WHERE key IN ('entries', 'bytes')")
+        }
+        return totals.get("entries", 0), totals.get("bytes", 0)
+
+    def _enforce_budget(self):
+        entries, size = self._totals()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+        self.cleanup()
+        entries, size = self._totals()
+        conn = self._connect()
+        # Evict finished tasks, least recently updated first, until within budget
+        rows = conn.execute(
+            f"SELECT id, {_ROW_SIZE} AS size FROM tasks WHERE finished_at IS NOT NULL ORDER BY updated_at"
+        ).fetchall()
+        evict = []
+        for row in rows:
+            if entries <= self.max_entries and size <= self.max_bytes:
+                break
+            evict.append(row["id"])
+            entries -= 1
+            size -= row["size"]
+        if evict:
+            conn.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in evict])
+            self._delete_orphaned_batch_tasks()
+            self._evictions += len(evict)
+
+    def load(self, window_seconds: int) -> Dict[str, Any]:
+        conn = self._connect()
+        counts = {
+            row["status"]: row["n"]
+            for row in conn.execute(
+                "SELECT status, COUNT(*) AS n FROM tasks WHERE status IN ('queued', 'running') GROUP BY status"
+            )
+        }
+        recent = conn.execute(
+            "SELECT COUNT(*) AS n, AVG(finished_at - started_at) AS avg_duration FROM tasks "
+            "WHERE finished_at >= ? AND status IN ('completed', 'failed') AND started_at IS NOT NULL",
+            (time.time() - window_seconds,),
+        ).fetchone()
+        return {
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "finished": recent["n"],
+            "avg_duration": recent["avg_duration"],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        counts = {
+            row["status"]: row["n"]
+            for row in conn.execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status")
+        }
+        _, size = self._totals()
+        return {
+            "backend": "sqlite",
+            "queued": counts.get("queued", 0),
+            "entries": sum(counts.values()),
+            "active_entries": counts.get("queued", 0) + counts.get("running", 0),
+            "bytes": size,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
+
+
+def _batch_item(task_id: str, url: Optional[str], status: Dict[str, Any], include_results: bool) -> Dict[str, Any]:
+    item = {
+        "task_id": task_id,
+        "url": url,
+        "status": status["progress"]["status"],
+        "progress": status["progress"]["progress"],
+        "message": status["progress"]["message"],
+    }
+    if "error" in status:
+        item["error"] = status["error"]
+    if include_results and "result" in status:
+        item["result"] = status["result"]
+    return item
+
+
+def _summarize(
+    batch_id: str,
+    owner_id: Optional[int],
+    created_at: float,
+    metadata: Dict[str, Any],
+    counts: Dict[str, int],
+    progress_sum: int,
+) -> Dict[str, Any]:
+    total = sum(counts.values())
+    finished = sum(counts.get(state_name, 0) for state_name in FINISHED_STATES)
+    if total and counts.get("cancelled", 0) == total:
+        state = "cancelled"
+    elif total and finished == total:
+        state = "completed"
+    elif counts.get("queued", 0) == total:
+        state = "queued"
+    else:
+        state = "running"
+    return {
+        "batch_id": batch_id,
+        "owner_id": owner_id,
+        "created_at": created_at,
+        "metadata": metadata,
+        "status": state,
+        "total": total,
+        "counts": {
+            state_name: counts.get(state_name, 0)
+            for state_name in ("queued", "running") + FINISHED_STATES
+        },
+        "progress": round(progress_sum / total) if total else 0,
+    }
+
+
+def _batch_summary(
+    batch_id: str,
+    owner_id: Optional[int],
+    created_at: float,
+    metadata: Dict[str, Any],
+    items: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    counts: Dict[str, int] = {}
+    for item in items:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    summary = _summarize(
+        batch_id, owner_id, created_at, metadata, counts, sum(item["progress"] for item in items)
+    )
+    summary["tasks"] = items
+    return summary
+
+
+def _without_items(batch: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in batch.items() if key != "tasks"}
+
+
+def create_task_backend() -> TaskBackend:
+    """Create the task backend selected by ``TASK_BACKEND``."""
+    if settings.TASK_BACKEND == "memory":
+        return MemoryTaskBackend(
+            ttl=settings.TASK_RESULT_TTL_SECONDS,
+            max_entries=settings.TASK_STORE_MAX_ENTRIES,
+            max_bytes=settings.TASK_STORE_MAX_BYTES,
+        )
+    if settings.TASK_BACKEND == "sqlite":
+        return SQLiteTaskBackend(
+            path=settings.TASK_DB_PATH,
+            ttl=settings.TASK_RESULT_TTL_SECONDS,
+            max_entries=settings.TASK_STORE_MAX_ENTRIES,
+            max_bytes=settings.TASK_STORE_MAX_BYTES,
+        )
+    raise ValueError(f"Unknown task backend: {settings.TASK_BACKEND}")
@@ -1,114 +1,463 @@
 # app/utils/task_queue.py
+import asyncio
+import contextvars
+import importlib
+import inspect
+import math
+import os
+import socket
 import threading
-import queue
-import time
 import uuid
 import logging
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from app.config import settings
+from app.utils.http_client import close_session
+from app.utils.task_backend import PRIORITY_BACKGROUND, PRIORITY_BULK, PRIORITY_INTERACTIVE, create_task_backend
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global task queue
-task_queue = queue.Queue()
-task_results = {}
-task_progress = {}
-task_workers = {}
+# Shared task queue and result storage
+task_backend = create_task_backend()
+
+# (function, interval in seconds) run by every worker pool, see add_periodic_job
+_periodic_jobs: List[Tuple[Callable, float]] = []
+
+# Worker pool running the current task, so its progress updates and result
+# are only recorded while that worker still holds the task
+_current_worker: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_worker", default=None)
+
+
+class WorkerPool:
+    """
+    Runs queued tasks on a single long-lived asyncio event loop.
+
+    ``concurrency`` slot coroutines claim tasks from the task backend, so up to
+    ``concurrency`` tasks can be waiting on network I/O at the same time. The
+    pool can run in a background thread of the API process (``start``) or
+    in the foreground of a dedicated worker process (``serve``).
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = max(1, concurrency)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._ready = threading.Event()
+        self._stopping = False
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def start(self) -> threading.Thread:
+        """Start the event loop in a daemon thread and wait until it runs."""
+        self._ready.clear()
+        self.thread = threading.Thread(target=self._run, name="task-worker-pool", daemon=True)
+        self.thread.start()
+        self._ready.wait()
+        logger.info(f"Worker pool started with {self.concurrency} slots (thread ID: {self.thread.ident})")
+        return self.thread
+
+    def is_alive(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def stop(self):
+        """
+        Stop claiming new tasks; ``serve`` returns once in-flight tasks finish.
+        Safe to call from any thread.
+        """
+        self._stopping = True
+        self.notify()
+
+    def notify(self):
+        """Wake idle slots after a task was enqueued. Safe to call from any thread."""
+        if self.loop is not None and self._wakeup is not None:
+            self.loop.call_soon_threadsafe(self._wakeup.set)
 
-def start_background_worker():
-    """Start a worker thread to process tasks from the queue."""
-    def worker():
-        logger.info("Background worker thread started")
+    def _run(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        """Run the slots and maintenance loop until cancelled."""
+        self.loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            # Pick up work left behind by workers that died mid-task
+            task_backend.requeue_stale(settings.TASK_LEASE_SECONDS)
+        except Exception as e:
+            logger.error(f"Failed to requeue stale tasks: {str(e)}")
+        slots = [asyncio.create_task(self._slot(slot)) for slot in range(self.concurrency)]
+        maintenance = asyncio.create_task(self._maintenance_loop())
+        cancel_watch = asyncio.create_task(self._cancel_loop())
+        periodic = [asyncio.create_task(self._periodic_loop(func, interval)) for func, interval in _periodic_jobs]
+        self._ready.set()
+        try:
+            await asyncio.gather(*slots)
+        finally:
+            maintenance.cancel()
+            cancel_watch.cancel()
+            for job in periodic:
+                job.cancel()
+            for slot in slots:
+                slot.cancel()
+            await close_session()
+        logger.info(f"Worker pool {self.worker_id} stopped")
+
+    async def _slot(self, slot: int):
+        logger.info(f"Worker slot {slot} ready")
+        while not self._stopping:
+            try:
+                job = task_backend.claim(self.worker_id)
+            except Exception as e:
+                logger.error(f"Worker slot {slot} failed to claim a task: {str(e)}")
+                job = None
+            if job is None:
+                await self._wait_for_work()
+                continue
+            task = asyncio.create_task(run_task(job["task_id"], job["name"], job["kwargs"], self.worker_id))
+            self._running[job["task_id"]] = task
+            try:
+                await task
+            except Exception as e:
+                logger.error(f"Worker slot {slot} error: {str(e)}")
+            finally:
+                self._running.pop(job["task_id"], None)
+
+    async def _wait_for_work(self):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=settings.TASK_POLL_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _cancel_loop(self):
+        """Stop running tasks whose cancellation was requested through the backend."""
         while True:
+            await asyncio.sleep(settings.TASK_POLL_INTERVAL_SECONDS)
+            if not self._running:
+                continue
+            try:
+                cancelled = task_backend.cancel_requested(list(self._running))
+            except Exception as e:
+                logger.error(f"Failed to check for cancelled tasks: {str(e)}")
+                continue
+            for task_id in cancelled:
+                task = self._running.get(task_id)
+                if task is not None:
+                    logger.info(f"Cancelling running task: {task_id}")
+                    task.cancel()
+
+    async def _periodic_loop(self, func: Callable, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await _call_task(func, {})
+            except Exception as e:
+                logger.error(f"Periodic job {_task_name(func)} failed: {str(e)}")
+
+    async def _maintenance_loop(self):
+        while True:
+            await asyncio.sleep(settings.TASK_CLEANUP_INTERVAL_SECONDS)
             try:
-                logger.info("Worker waiting for task...")
-                task_id, task_func, args, kwargs = task_queue.get()
-                logger.info(f"Processing task: {task_id}")
-                
-                # Update task status
-                task_progress[task_id] = {
-                    "status": "running",
-                    "progress": 0,
-                    "message": "Task started"
-                }
-                
-                try:
-                    # Run the task function
-                    result = task_func(*args, **kwargs)
-                    logger.info(f"Task completed: {task_id}")
-                    task_results[task_id] = {
-                        "status": "completed",
-                        "result": result
-                    }
-                except Exception as e:
-                    logger.error(f"Task failed: {task_id} - Error: {str(e)}")
-                    task_results[task_id] = {
-                        "status": "failed",
-                        "error": str(e)
-                    }
-                
-                # Clean up progress tracking
-                task_progress[task_id]["status"] = task_results[task_id]["status"]
-                task_progress[task_id]["progress"] = 100
-                
-                # Cleanup old tasks
                 cleanup_old_tasks()
-                
-                task_queue.task_done()
+                task_backend.requeue_stale(settings.TASK_LEASE_SECONDS)
             except Exception as e:
-                logger.error(f"Worker error: {str(e)}")
-                time.sleep(1)  # Avoid tight loop if there's an error
-                
-    # Start worker thread
-    thread = threading.Thread(target=worker, daemon=True)
-    thread.start()
-    logger.info(f"Background worker thread started with ID: {thread.ident}")
-    return thread
-
-def add_task(task_func: Callable, *args, **kwargs) -> str:
-    """Add a task to the queue and return its ID."""
+                logger.error(f"Task cleanup error: {str(e)}")
+
+
+def _task_name(task_func: Callable) -> str:
+    return f"{task_func.__module__}:{task_func.__qualname__}"
+
+
+def _resolve_task(name: str) -> Callable:
+    module_name, qualname = name.split(":", 1)
+    target = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        target = getattr(target, attr)
+    return target
+
+
+def _accepts_task_id(task_func: Callable) -> bool:
+    try:
+        return "task_id" in inspect.signature(task_func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+async def _call_task(task_func: Callable, kwargs: dict) -> Any:
+    if inspect.iscoroutinefunction(task_func):
+        return await task_func(**kwargs)
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    result = await loop.run_in_executor(None, lambda: context.run(task_func, **kwargs))
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def run_task(task_id: str, name: str, kwargs: dict, worker_id: Optional[str] = None):
+    """
+    Execute a single claimed task and record its outcome.
+
+    Coroutine functions are awaited on the worker loop; plain functions run in
+    the loop's default executor so they cannot block the other slots. If the
+    task function takes a ``task_id`` argument it is passed automatically.
+
+    Tasks running longer than ``TASK_DEADLINE_SECONDS`` fail, and cancelling
+    the asyncio task running this coroutine records the task as cancelled.
+    Either way the awaited fetches and LLM calls are aborted; a plain function
+    already running in the executor is abandoned rather than interrupted.
+
+    With ``worker_id``, progress and the outcome are only recorded while that
+    worker still holds the task; once it was requeued to another worker or
+    cancelled, they are discarded.
+    """
+    logger.info(f"Processing task: {task_id}")
+    _current_worker.set(worker_id)
+
+    try:
+        task_func = _resolve_task(name)
+        if _accepts_task_id(task_func) and "task_id" not in kwargs:
+            kwargs = {**kwargs, "task_id": task_id}
+
+        result = await asyncio.wait_for(
+            _call_task(task_func, kwargs), timeout=settings.TASK_DEADLINE_SECONDS or None
+        )
+        logger.info(f"Task completed: {task_id}")
+        _finish_task(task_id, {
+            "status": "completed",
+            "result": result
+        })
+    except asyncio.CancelledError:
+        logger.info(f"Task cancelled: {task_id}")
+        _finish_task(task_id, {
+            "status": "cancelled",
+            "error": "Task cancelled"
+        })
+    except asyncio.TimeoutError:
+        logger.error(f"Task timed out: {task_id}")
+        _finish_task(task_id, {
+            "status": "failed",
+            "error": f"Task exceeded its deadline of {settings.TASK_DEADLINE_SECONDS} seconds"
+        })
+    except Exception as e:
+        logger.error(f"Task failed: {task_id} - Error: {str(e)}")
+        _finish_task(task_id, {
+            "status": "failed",
+            "error": str(e)
+        })
+
+
+def _finish_task(task_id: str, result: Dict[str, Any]):
+    if not task_backend.finish(task_id, result, worker_id=_current_worker.get()):
+        logger.warning(f"Discarded {result['status']} outcome of task {task_id}, no longer held by this worker")
+
+
+def start_background_worker() -> WorkerPool:
+    """Start a worker pool in a background thread of the current process."""
+    global worker_pool
+    worker_pool = WorkerPool(settings.TASK_WORKER_CONCURRENCY)
+    worker_pool.start()
+    return worker_pool
+
+def add_task(
+    task_func: Callable,
+    kwargs: Optional[Dict[str, Any]] = None,
+    *,
+    owner_id: Optional[int] = None,
+    priority: int = PRIORITY_BULK,
+    dedup_key: Optional[str] = None,
+) -> str:
+    """
+    Add a task to the queue and return its ID.
+
+    ``task_func`` must be a module-level function (coroutine or plain) so
+    that any worker process can import it, and ``kwargs`` must be
+    JSON-serializable. ``owner_id`` restricts bulk status queries to the
+    owning user and is the unit of fair scheduling; ``priority`` is
+    ``PRIORITY_INTERACTIVE``, ``PRIORITY_BULK`` or ``PRIORITY_BACKGROUND``.
+    With a ``dedup_key`` matching an unfinished task of the same owner, the
+    ID of that task is returned and nothing is queued.
+    """
     task_id = str(uuid.uuid4())
+    queued_id = task_backend.enqueue(
+        task_id, _task_name(task_func), kwargs or {}, owner_id=owner_id, priority=priority, dedup_key=dedup_key
+    )
+    if queued_id != task_id:
+        logger.info(f"Task already queued: {queued_id}")
+        return queued_id
     logger.info(f"Adding task to queue: {task_id}")
-    task_queue.put((task_id, task_func, args, kwargs))
-    
-    # Initialize task status
-    task_results[task_id] = {"status": "pending"}
-    task_progress[task_id] = {
-        "status": "queued",
-        "progress": 0,
-        "message": "Task queued"
-    }
-    
+    if worker_pool is not None:
+        worker_pool.notify()
     return task_id
 
-def get_task_status(task_id: str) -> Dict[str, Any]:
-    """Get the status of a task."""
-    result = task_results.get(task_id, {"status": "unknown"})
-    progress = task_progress.get(task_id, {
-        "status": "unknown",
-        "progress": 0,
-        "message": "Task not found"
-    })
-    
+def add_periodic_job(func: Callable, interval_seconds: float):
+    """
+    Run ``func`` every ``interval_seconds`` on each worker pool started
+    afterwards. Every worker process runs its own copy, so jobs that queue
+    work should use ``dedup_key``s to avoid queueing it several times.
+    """
+    if interval_seconds and interval_seconds > 0:
+        _periodic_jobs.append((func, interval_seconds))
+
+def add_batch(
+    task_func: Callable,
+    items: List[Dict[str, Any]],
+    *,
+    owner_id: Optional[int] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    priority: int = PRIORITY_BULK,
+) -> Dict[str, Any]:
+    """
+    Queue one task per item as a single batch.
+
+    Each item is ``{"url": ..., "kwargs": {...}}`` with an optional
+    ``dedup_key``; items whose key matches an unfinished task of the same
+    owner share that task instead of running again. Returns the batch ID,
+    the ``{"url", "task_id"}`` pairs in submission order and how many items
+    were deduplicated.
+    """
+    batch_id = str(uuid.uuid4())
+    jobs = [
+        {
+            "task_id": str(uuid.uuid4()),
+            "url": item["url"],
+            "kwargs": item["kwargs"],
+            "dedup_key": item.get("dedup_key"),
+        }
+        for item in items
+    ]
+    logger.info(f"Adding batch to queue: {batch_id} with {len(jobs)} tasks")
+    task_ids = task_backend.enqueue_batch(
+        batch_id, _task_name(task_func), jobs, owner_id=owner_id, metadata=metadata, priority=priority
+    )
+    deduplicated = sum(1 for job, task_id in zip(jobs, task_ids) if task_id != job["task_id"])
+    if deduplicated:
+        logger.info(f"Batch {batch_id} joined {deduplicated} in-flight tasks")
+    if worker_pool is not None and deduplicated < len(jobs):
+        worker_pool.notify()
+    return {
+        "batch_id": batch_id,
+        "tasks": [{"url": job["url"], "task_id": task_id} for job, task_id in zip(jobs, task_ids)],
+        "deduplicated": deduplicated,
+    }
+
+def estimate_queue_wait(new_tasks: int = 0) -> Dict[str, Any]:
+    """
+    Estimate how long ``new_tasks`` bulk tasks submitted now would wait.
+
+    Throughput is the larger of the completion rate observed over
+    ``TASK_THROUGHPUT_WINDOW_SECONDS`` and the rate the busy worker slots can
+    sustain at the recent average task duration, so the estimate neither
+    drops to zero after an idle period nor ignores a backlog being drained.
+    """
+    window = settings.TASK_THROUGHPUT_WINDOW_SECONDS
+    load = task_backend.load(window)
+    duration = load["avg_duration"] or settings.TASK_ESTIMATED_DURATION_SECONDS
+    slots = max(load["running"], settings.TASK_WORKER_CONCURRENCY)
+    throughput = max(load["finished"] / window, slots / duration)
+    # Tasks that fit into idle slots start right away
+    backlog = max(0, load["queued"] + new_tasks - (slots - load["running"]))
+    return {
+        "queued": load["queued"],
+        "running": load["running"],
+        "throughput": throughput,
+        "backlog": backlog,
+        "estimated_wait_seconds": backlog / throughput,
+    }
+
+def check_admission(new_tasks: int, priority: int = PRIORITY_BULK) -> Dict[str, Any]:
+    """
+    Decide whether ``new_tasks`` more tasks can be queued without exceeding
+    ``TASK_MAX_QUEUE_DEPTH`` or, for bulk work, ``TASK_MAX_QUEUE_WAIT_SECONDS``.
+
+    Returns the queue estimate plus ``admitted`` and, when rejected,
+    ``retry_after``: the seconds until enough of the backlog has drained.
+    Interactive tasks run ahead of the bulk backlog, so only the depth limit
+    applies to them.
+    """
+    estimate = estimate_queue_wait(new_tasks)
+    throughput = estimate["throughput"]
+    excess = 0.0
+    if settings.TASK_MAX_QUEUE_DEPTH:
+        excess = max(excess, estimate["queued"] + new_tasks - settings.TASK_MAX_QUEUE_DEPTH)
+    if settings.TASK_MAX_QUEUE_WAIT_SECONDS and priority <= PRIORITY_BULK:
+        allowed = throughput * settings.TASK_MAX_QUEUE_WAIT_SECONDS
+        excess = max(excess, estimate["backlog"] - allowed)
+    admitted = excess <= 0
+    if not admitted:
+        logger.warning(
+            f"Rejecting {new_tasks} tasks: {estimate['queued']} queued, "
+            f"estimated wait {estimate['estimated_wait_seconds']:.0f}s"
+        )
     return {
-        **result,
-        "progress": progress
+        **estimate,
+        "admitted": admitted,
+        "retry_after": 0 if admitted else min(max(1, math.ceil(excess / throughput)), 3600),
     }
 
+def unknown_task_status() -> Dict[str, Any]:
+    """Status reported for tasks that do not exist or have expired."""
+    return {
+        "status": "unknown",
+        "progress": {
+            "status": "unknown",
+            "progress": 0,
+            "message": "Task not found"
+        }
+    }
+
+def get_task_status(task_id: str) -> Dict[str, Any]:
+    """Get the status of a task."""
+    status = task_backend.get(task_id)
+    if status is None:
+        return unknown_task_status()
+    return status
+
+def get_task_statuses(
+    task_ids: List[str], since_version: int = 0, owner_id: Optional[int] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Get the statuses of several tasks that changed after ``since_version``."""
+    return task_backend.get_many(task_ids, since_version=since_version, owner_id=owner_id)
+
+def get_changed_tasks(owner_id: int, since_version: int = 0) -> Dict[str, Dict[str, Any]]:
+    """Get every task of ``owner_id`` that changed after ``since_version``, oldest change first."""
+    return task_backend.get_changed(owner_id, since_version=since_version)
+
+def get_batch_task_ids(batch_id: str) -> List[str]:
+    """Get the IDs of the tasks submitted together as ``batch_id``."""
+    return task_backend.get_batch_task_ids(batch_id)
+
+def get_batch(batch_id: str, include_results: bool = False) -> Optional[Dict[str, Any]]:
+    """Get a batch with its counts by state, aggregate progress and per-URL statuses."""
+    return task_backend.get_batch(batch_id, include_results=include_results)
+
+def list_batches(owner_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+    """Get summaries of the most recent batches of ``owner_id``."""
+    return task_backend.list_batches(owner_id, limit=limit)
+
+def cancel_tasks(task_ids: List[str], owner_id: Optional[int] = None) -> Dict[str, List[str]]:
+    """
+    Cancel tasks: queued ones immediately, running ones as soon as their
+    worker notices. Returns ``{"cancelled": [...], "cancelling": [...]}``.
+    """
+    logger.info(f"Cancelling {len(task_ids)} tasks")
+    return task_backend.cancel(task_ids, owner_id=owner_id)
+
 def update_task_progress(task_id: str, progress: int, message: str):
     """Update the progress of a task."""
     logger.info(f"Updating task progress: {task_id} - {progress}% - {message}")
-    if task_id in task_progress:
-        task_progress[task_id].update({
-            "progress": progress,
-            "message": message
-        })
+    task_backend.update_progress(task_id, progress, message, worker_id=_current_worker.get())
+
+def cleanup_old_tasks() -> int:
+    """Remove finished tasks whose TTL has expired."""
+    return task_backend.cleanup()
 
-def cleanup_old_tasks():
-    """Clean up tasks older than 1 hour."""
-    # Implementation omitted for brevity
-    pass
+def get_task_store_stats() -> Dict[str, Any]:
+    """Get entry, memory and eviction counters for the task store."""
+    return task_backend.stats()
 
-logger.info("Initializing task queue system")
-worker_thread = start_background_worker()
\ No newline at end of file
+# Embedded worker pool, started by the API process when TASK_RUN_EMBEDDED_WORKER
+# is enabled. Dedicated worker processes run ``python -m app.worker`` instead.
+worker_pool: Optional[WorkerPool] = None
@@ -0,0 +1,223 @@
+# app/utils/task_store.py
+import json
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _entry_size(result: Dict[str, Any], progress: Dict[str, Any]) -> int:
+    """Approximate the memory held by an entry by its JSON-encoded size."""
+    return len(json.dumps(result, default=str)) + len(json.dumps(progress, default=str))
+
+
+class TaskStore:
+    """
+    Bounded in-memory store for task results and progress.
+
+    Finished tasks expire ``ttl`` seconds after they finish and are evicted in
+    least-recently-used order whenever the store exceeds ``max_entries`` or
+    ``max_bytes``. Queued and running tasks are never evicted.
+
+    Every change stamps the entry with a new value of a store-wide version
+    counter so clients can ask for only the tasks that changed since the
+    last version they saw.
+    """
+
+    def __init__(self, ttl: int, max_entries: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._version = 0
+
+    def create(self, task_id: str, owner_id: Optional[int] = None):
+        """Register a newly queued task."""
+        with self._lock:
+            self._put(task_id, {"status": "pending"}, {
+                "status": "queued",
+                "progress": 0,
+                "message": "Task queued"
+            }, owner_id=owner_id)
+            self._enforce_budget()
+
+    def mark_running(self, task_id: str):
+        with self._lock:
+            entry = self._entries.get(task_id)
+            result = entry["result"] if entry else {"status": "pending"}
+            self._put(task_id, result, {
+                "status": "running",
+                "progress": 0,
+                "message": "Task started"
+            }, owner_id=entry["owner_id"] if entry else None)
+
+    def update_progress(self, task_id: str, progress: int, message: str) -> bool:
+        """
+        Update the progress of an unfinished task. Updates arriving after the
+        task finished, e.g. from a task racing its deadline or cancellation,
+        are ignored and False is returned.
+        """
+        with self._lock:
+            entry = self._entries.get(task_id)
+            if entry is None or entry["expires_at"] is not None:
+                return False
+            self._put(task_id, entry["result"], {
+                **entry["progress"],
+                "progress": progress,
+                "message": message
+            }, owner_id=entry["owner_id"])
+            return True
+
+    def finish(self, task_id: str, result: Dict[str, Any]):
+        """Record the final result of a task and start its TTL."""
+        with self._lock:
+            entry = self._entries.get(task_id)
+            progress = dict(entry["progress"]) if entry else {"message": ""}
+            progress["status"] = result["status"]
+            progress["progress"] = 100
+            self._put(task_id, result, progress, owner_id=entry["owner_id"] if entry else None,
+                      expires_at=time.time() + self.ttl)
+            self._enforce_budget()
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Return the status of a task, or None if it is unknown or expired."""
+        with self._lock:
+            entry = self._lookup(task_id, time.time())
+            return self._to_status(entry) if entry else None
+
+    def get_many(
+        self, task_ids: Iterable[str], since_version: int = 0, owner_id: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the statuses of the given tasks that changed after
+        ``since_version``, optionally restricted to tasks of ``owner_id``.
+        """
+        now = time.time()
+        statuses = {}
+        with self._lock:
+            for task_id in task_ids:
+                entry = self._lookup(task_id, now)
+                if entry is None or entry["version"] <= since_version:
+                    continue
+                if owner_id is not None and entry["owner_id"] != owner_id:
+                    continue
+                statuses[task_id] = self._to_status(entry)
+        return statuses
+
+    def get_changed(self, owner_id: int, since_version: int = 0, limit: int = 500) -> Dict[str, Dict[str, Any]]:
+        """Return up to ``limit`` tasks of ``owner_id`` changed after ``since_version``, oldest change first."""
+        now = time.time()
+        with self._lock:
+            changed = [
+                (task_id, entry) for task_id, entry in self._entries.items()
+                if entry["owner_id"] == owner_id and entry["version"] > since_version
+                and not self._is_expired(entry, now)
+            ]
+            changed.sort(key=lambda item: item[1]["version"])
+            return {task_id: self._to_status(entry) for task_id, entry in changed[:limit]}
+
+    def _lookup(self, task_id: str, now: float) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(task_id)
+        if entry is None:
+            return None
+        if self._is_expired(entry, now):
+            self._remove(task_id)
+            self._expirations += 1
+            return None
+        self._entries.move_to_end(task_id)
+        return entry
+
+    @staticmethod
+    def _to_status(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **entry["result"],
+            "progress": dict(entry["progress"]),
+            "version": entry["version"]
+        }
+
+    def __contains__(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._entries
+
+    def cleanup(self) -> int:
+        """Drop every expired entry and return how many were removed."""
+        now = time.time()
+        with self._lock:
+            expired = [task_id for task_id, entry in self._entries.items() if self._is_expired(entry, now)]
+            for task_id in expired:
+                self._remove(task_id)
+            self._expirations += len(expired)
+        if expired:
+            logger.info(f"Removed {len(expired)} expired tasks")
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            active = sum(1 for entry in self._entries.values() if entry["expires_at"] is None)
+            return {
+                "entries": len(self._entries),
+                "active_entries": active,
+                "bytes": self._bytes,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
+
+    def _put(
+        self,
+        task_id: str,
+        result: Dict[str, Any],
+        progress: Dict[str, Any],
+        owner_id: Optional[int] = None,
+        expires_at: Optional[float] = None,
+    ):
+        old = self._entries.pop(task_id, None)
+        if old is not None:
+            self._bytes -= old["size"]
+        size = _entry_size(result, progress)
+        self._version += 1
+        self._entries[task_id] = {
+            "result": result,
+            "progress": progress,
+            "owner_id": owner_id,
+            "version": self._version,
+            "expires_at": expires_at,
+            "size": size,
+        }
+        self._bytes += size
+
+    def _remove(self, task_id: str):
+        entry = self._entries.pop(task_id, None)
+        if entry is not None:
+            self._bytes -= entry["size"]
+
+    @staticmethod
+    def _is_expired(entry: Dict[str, Any], now: float) -> bool:
+        return entry["expires_at"] is not None and entry["expires_at"] <= now
+
+    def _over_budget(self) -> bool:
+        return len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+
+    def _enforce_budget(self):
+        if not self._over_budget():
+            return
+        self.cleanup()
+        # Entries are kept in LRU order; walk from the oldest and only evict
+        # tasks that have finished
+        for task_id in list(self._entries):
+            if not self._over_budget():
+                break
+            if self._entries[task_id]["expires_at"] is not None:
+                self._remove(task_id)
+                self._evictions += 1
+        if self._over_budget():
+            logger.warning("Task store over budget with only active tasks remaining")
@@ -1,18 +1,47 @@
-import aiohttp
 from bs4 import BeautifulSoup
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import re
 import logging
-from urllib.parse import urljoin, urlparse
+from html import unescape
+from urllib.parse import urlparse
+
+from app.config import settings
+from app.utils.http_client import XML_CONTENT_TYPES, fetch_text, gather_limited
+from app.utils.link_ranker import rank_links
+from app.utils.page_extractor import company_name_from_title, company_name_from_url
+from app.utils.parse_pool import extract_page
 
 logger = logging.getLogger(__name__)
 
+_SITEMAP_LOC = re.compile(r'<loc>\s*([^<\s]+)\s*</loc>', re.I)
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so that trivially different spellings of the same page
+    compare equal: lowercase scheme and host, no default port, fragment or
+    trailing slash, and ``http://`` assumed when no scheme is given.
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = f"http://{url}"
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    if parsed.port and (scheme, parsed.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parsed.port}"
+    path = parsed.path.rstrip("/") or "/"
+    query = f"?{parsed.query}" if parsed.query else ""
+    return f"{scheme}://{host}{path}{query}"
+
+def normalize_domain(url: str) -> str:
+    """Return the lowercase host of a URL without a leading ``www.``."""
+    host = urlparse(normalize_url(url)).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
 async def fetch_url(url: str) -> str:
     """Fetch HTML content from a URL."""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=30) as response:
-                return await response.text()
+        return await fetch_text(url)
     except Exception as e:
         logger.error(f"Error fetching URL {url}: {str(e)}")
         return ""
@@ -23,10 +52,7 @@ def extract_company_name(soup: BeautifulSoup, url: str) -> str:
     title = soup.title.string if soup.title else ""
     if title:
         # Clean up common title patterns
-        company = re.sub(r' - Home.*$', '', title)
-        company = re.sub(r' \| .*$', '', company)
-        company = re.sub(r' – .*$', '', company)
-        return company.strip()
+        return company_name_from_title(title)
     
     # Try to get from meta tags
     meta_name = soup.find('meta', property='og:site_name')
@@ -39,10 +65,7 @@ def extract_company_name(soup: BeautifulSoup, url: str) -> str:
         return logo.get('alt')
     
     # Fallback to domain name
-    domain = urlparse(url).netloc
-    domain = re.sub(r'^www\.', '', domain)
-    domain = re.sub(r'\.com$|\.org$|\.net$', '', domain)
-    return domain.title()
+    return company_name_from_url(url)
 
 def extract_company_description(soup: BeautifulSoup) -> str:
     """Extract company description from the website."""
@@ -99,29 +122,52 @@ def extract_business_areas(soup: BeautifulSoup) -> List[str]:
     
     return business_areas[:10]  # Limit to top 10
 
+def _page_links(soup: BeautifulSoup) -> List[Tuple[str, str]]:
+    return [(link.get('href'), link.get_text()) for link in soup.find_all('a', href=True)]
+
 def find_about_page_url(soup: BeautifulSoup, base_url: str) -> Optional[str]:
     """Find URL to the about page if it exists."""
-    about_links = soup.find_all('a', text=re.compile(r'about|company', re.I))
-    if not about_links:
-        about_links = soup.find_all('a', {'href': re.compile(r'about|company', re.I)})
-    
-    if about_links:
-        about_url = about_links[0].get('href')
-        if about_url:
-            return urljoin(base_url, about_url)
-    return None
+    about_urls = rank_links(_page_links(soup), base_url, "about")
+    return about_urls[0] if about_urls else None
 
 def find_contact_page_url(soup: BeautifulSoup, base_url: str) -> Optional[str]:
     """Find URL to the contact page if it exists."""
-    contact_links = soup.find_all('a', text=re.compile(r'contact', re.I))
-    if not contact_links:
-        contact_links = soup.find_all('a', {'href': re.compile(r'contact', re.I)})
-    
-    if contact_links:
-        contact_url = contact_links[0].get('href')
-        if contact_url:
-            return urljoin(base_url, contact_url)
-    return None
+    contact_urls = rank_links(_page_links(soup), base_url, "contact")
+    return contact_urls[0] if contact_urls else None
+
+async def fetch_sitemap_urls(url: str) -> List[str]:
+    """
+    Page URLs listed in the sitemap.xml of ``url``'s site. A sitemap index is
+    followed into one of its sitemaps, preferably the one for pages.
+    """
+    parsed = urlparse(url)
+    sitemap_url = f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"
+    for _ in range(2):
+        try:
+            xml = await fetch_text(sitemap_url, content_types=XML_CONTENT_TYPES)
+        except Exception as e:
+            logger.info(f"No sitemap at {sitemap_url}: {str(e)}")
+            return []
+        locs = [unescape(loc) for loc in _SITEMAP_LOC.findall(xml)]
+        if not locs or "<sitemapindex" not in xml[:4096].lower():
+            return locs
+        sitemap_url = next((loc for loc in locs if "page" in loc.lower()), locs[0])
+    return []
+
+async def add_sitemap_candidates(page: Dict[str, Any], url: str, kinds: Tuple[str, ...] = ("about", "contact")) -> Dict[str, Any]:
+    """
+    Rank the pages of the site's sitemap as about/contact candidates when
+    ``page`` (a ``summarize_page`` result for ``url``) is the homepage and
+    links to none. Inner pages need not link them.
+    """
+    missing = [kind for kind in kinds if not page[f"{kind}_urls"]]
+    if not missing or not settings.HTTP_SITEMAP_FALLBACK or urlparse(url).path not in ("", "/"):
+        return page
+    links = [(loc, "") for loc in await fetch_sitemap_urls(url)]
+    for kind in missing:
+        page[f"{kind}_urls"] = rank_links(links, url, kind)
+        page[f"{kind}_url"] = page[f"{kind}_urls"][0] if page[f"{kind}_urls"] else None
+    return page
 
 async def scrape_site(url: str) -> Dict[str, Any]:
     """Scrape website content to extract company information."""
@@ -129,30 +175,23 @@ async def scrape_site(url: str) -> Dict[str, Any]:
     if not html:
         return {}
     
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    # Extract basic info
-    company_name = extract_company_name(soup, url)
-    description = extract_company_description(soup)
-    business_areas = extract_business_areas(soup)
-    
-    # Find about and contact pages
-    about_url = find_about_page_url(soup, url)
-    contact_url = find_contact_page_url(soup, url)
+    page = await extract_page(html, url)
+    description = page["description"]
+    if not description or len(description) < 100:
+        page = await add_sitemap_candidates(page, url, kinds=("about",))
     
     # If we have an about page, scrape it for better info
-    if about_url and about_url != url:
+    about_url = page["about_url"]
+    if about_url and about_url != url and (not description or len(description) < 100):
         about_html = await fetch_url(about_url)
         if about_html:
-            about_soup = BeautifulSoup(about_html, 'html.parser')
-            if not description or len(description) < 100:
-                description = extract_company_description(about_soup) or description
+            description = (await extract_page(about_html, about_url))["description"] or description
     
     return {
-        "name": company_name,
+        "name": page["name"],
         "description": description,
-        "business_areas": business_areas,
-        "contact_url": contact_url
+        "business_areas": page["business_areas"],
+        "contact_url": page["contact_url"]
     }
 
 async def extract_company_info(main_url: str, additional_urls: Optional[List[str]] = None) -> Dict[str, Any]:
@@ -166,25 +205,29 @@ async def extract_company_info(main_url: str, additional_urls: Optional[List[str
     Returns:
         A dictionary containing company information
     """
-    # Scrape main website
-    company_info = await scrape_site(main_url)
-    
-    # Scrape additional URLs if provided
-    if additional_urls:
-        for url in additional_urls:
-            if url and url != main_url:
-                additional_info = await scrape_site(url)
-                
-                # Merge descriptions if we got a new one
-                if additional_info.get("description") and len(additional_info["description"]) > len(company_info.get("description", "")):
-                    company_info["description"] = additional_info["description"]
-                
-                # Add business areas
-                if additional_info.get("business_areas"):
-                    existing_areas = set(company_info.get("business_areas", []))
-                    for area in additional_info["business_areas"]:
-                        if area not in existing_areas:
-                            company_info.setdefault("business_areas", []).append(area)
+    # Scrape the main website and any additional URLs concurrently; the
+    # additional sites only enrich the main one, so merge them in order
+    urls = [main_url] + [url for url in additional_urls or [] if url and url != main_url]
+    results = await gather_limited(scrape_site(url) for url in urls)
+    for url, info in zip(urls, results):
+        if isinstance(info, Exception):
+            logger.error(f"Error scraping {url}: {str(info)}")
+    company_info = results[0] if isinstance(results[0], dict) else {}
+    
+    for additional_info in results[1:]:
+        if not isinstance(additional_info, dict):
+            continue
+        
+        # Merge descriptions if we got a new one
+        if additional_info.get("description") and len(additional_info["description"]) > len(company_info.get("description", "")):
+            company_info["description"] = additional_info["description"]
+        
+        # Add business areas
+        if additional_info.get("business_areas"):
+            existing_areas = set(company_info.get("business_areas", []))
+            for area in additional_info["business_areas"]:
+                if area not in existing_areas:
+                    company_info.setdefault("business_areas", []).append(area)
     
     # Ensure we have at least empty values for required fields
     company_info.setdefault("name", "")
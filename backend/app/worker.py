@@ -0,0 +1,60 @@
+# app/worker.py
+"""
+Standalone task worker.
+
+Claims email generation tasks from the shared task backend and runs them,
+independently of the API server:
+
+    python -m app.worker --concurrency 16
+
+Run the API with TASK_RUN_EMBEDDED_WORKER=false so that all tasks are
+handled by worker processes.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.config import settings
+from app.utils.parse_pool import shutdown_parse_pool
+from app.utils.task_queue import WorkerPool
+# Registers the periodic target profile refresh
+import app.utils.llm_agent  # noqa: F401
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Process queued email generation tasks.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.TASK_WORKER_CONCURRENCY,
+        help="Number of tasks processed concurrently (default: TASK_WORKER_CONCURRENCY)",
+    )
+    return parser.parse_args()
+
+
+async def run_worker(concurrency: int):
+    pool = WorkerPool(concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # Finish in-flight tasks before exiting
+        loop.add_signal_handler(sig, pool.stop)
+    logger.info(f"Worker {pool.worker_id} starting with {pool.concurrency} slots")
+    await pool.serve()
+
+
+def main():
+    args = parse_args()
+    if settings.TASK_BACKEND == "memory":
+        raise SystemExit("The memory task backend is process-local; set TASK_BACKEND=sqlite to run a separate worker")
+    try:
+        asyncio.run(run_worker(args.concurrency))
+    finally:
+        shutdown_parse_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,68 @@
 // frontend/src/components/emails/EmailGenerationProgress.jsx
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { tasks as tasksApi } from '../../lib/api';
 
 import { Progress } from '../ui/progress';
 import { Alert, AlertDescription } from '../ui/alert';
-import { Check, X, AlertTriangle, RotateCw } from 'lucide-react';
+import { Check, X, AlertTriangle, RotateCw, Ban } from 'lucide-react';
+import { Button } from '../ui/button';
 
-export function EmailGenerationProgress({ tasks }) {
+const FINISHED_STATUSES = ['completed', 'failed', 'cancelled'];
+
+export function EmailGenerationProgress({ tasks, batchId }) {
   const [taskStatus, setTaskStatus] = useState({});
   const [isPolling, setIsPolling] = useState(true);
   const [error, setError] = useState('');
   const [retryCount, setRetryCount] = useState(0);
+  const [useStream, setUseStream] = useState(typeof EventSource !== 'undefined');
+  const [isCancelling, setIsCancelling] = useState(false);
+  const statusRef = useRef({});
+  const versionRef = useRef(0);
+  
+  // Receive progress as it happens over Server-Sent Events
+  useEffect(() => {
+    if (!useStream || !isPolling || tasks.length === 0) return;
+    
+    const source = new EventSource(
+      tasksApi.eventsUrl({ taskIds: tasks.map(task => task.task_id) })
+    );
+    
+    source.addEventListener('task', (event) => {
+      const status = JSON.parse(event.data);
+      versionRef.current = Math.max(versionRef.current, status.version);
+      statusRef.current = { ...statusRef.current, [status.task_id]: status };
+      setTaskStatus(statusRef.current);
+      setError('');
+    });
+    
+    source.addEventListener('done', () => {
+      source.close();
+      setIsPolling(false);
+    });
+    
+    // Fall back to polling if the stream cannot be used
+    source.onerror = () => {
+      source.close();
+      setUseStream(false);
+    };
+    
+    return () => source.close();
+  }, [tasks, isPolling, useStream]);
   
   useEffect(() => {
+    if (useStream) return;
+    
     let pollingId = null;
     
     const fetchStatus = async () => {
       try {
         let allCompleted = true;
-        const newStatus = { ...taskStatus };
+        const newStatus = { ...statusRef.current };
         const taskIdsToCheck = [];
         
-        // Only check tasks that are not completed or failed
+        // Only check tasks that have not finished
         for (const task of tasks) {
-          if (
-            newStatus[task.task_id]?.status !== 'completed' && 
-            newStatus[task.task_id]?.status !== 'failed'
-          ) {
+          if (!FINISHED_STATUSES.includes(newStatus[task.task_id]?.status)) {
             taskIdsToCheck.push(task.task_id);
           }
         }
@@ -37,21 +73,22 @@ export function EmailGenerationProgress({ tasks }) {
           return;
         }
         
-        // Batch request all task statuses in one go
-        const statuses = await Promise.all(
-          taskIdsToCheck.map(id => tasksApi.getStatus(id))
-        );
+        // Fetch all task statuses in one request, only for tasks that
+        // changed since the last poll
+        const response = await tasksApi.getStatuses({
+          taskIds: taskIdsToCheck,
+          sinceVersion: versionRef.current,
+        });
+        versionRef.current = response.version;
+        Object.assign(newStatus, response.tasks);
         
-        // Update statuses
-        taskIdsToCheck.forEach((id, index) => {
-          const status = statuses[index];
-          newStatus[id] = status;
-          
-          if (status.status !== 'completed' && status.status !== 'failed') {
+        for (const id of taskIdsToCheck) {
+          if (!FINISHED_STATUSES.includes(newStatus[id]?.status)) {
             allCompleted = false;
           }
-        });
+        }
         
+        statusRef.current = newStatus;
         setTaskStatus(newStatus);
         setError(''); // Clear any previous errors
         setRetryCount(0); // Reset retry count on successful requests
@@ -84,7 +121,7 @@ export function EmailGenerationProgress({ tasks }) {
     return () => {
       if (pollingId) clearTimeout(pollingId);
     };
-  }, [tasks, isPolling, retryCount]);
+  }, [tasks, isPolling, retryCount, useStream]);
   
   const getOverallProgress = () => {
     if (tasks.length === 0) return 0;
@@ -105,12 +142,34 @@ export function EmailGenerationProgress({ tasks }) {
   
   const overallProgress = getOverallProgress();
   
+  const handleCancel = async () => {
+    setIsCancelling(true);
+    try {
+      if (batchId) {
+        await tasksApi.cancelBatch(batchId);
+      } else {
+        await Promise.all(tasks.map(task => tasksApi.cancelTask(task.task_id)));
+      }
+    } catch (err) {
+      setError(err.message || 'Failed to cancel email generation.');
+    } finally {
+      setIsCancelling(false);
+    }
+  };
+  
   return (
     <div className="space-y-6">
       <div className="space-y-2">
         <div className="flex justify-between items-center">
           <h3 className="text-lg font-medium">Overall Progress</h3>
-          <span className="text-sm font-medium">{overallProgress}%</span>
+          <div className="flex items-center gap-3">
+            <span className="text-sm font-medium">{overallProgress}%</span>
+            {isPolling && (
+              <Button variant="outline" size="sm" onClick={handleCancel} disabled={isCancelling}>
+                {isCancelling ? 'Cancelling...' : 'Cancel'}
+              </Button>
+            )}
+          </div>
         </div>
         <Progress value={overallProgress} className="h-2" />
       </div>
@@ -125,14 +184,14 @@ export function EmailGenerationProgress({ tasks }) {
         <h3 className="text-lg font-medium">Individual Tasks</h3>
         
         <div className="space-y-3">
-          {tasks.map(task => {
+          {tasks.map((task, index) => {
             const status = taskStatus[task.task_id];
             const progress = status?.progress?.progress || 0;
             const message = status?.progress?.message || 'Initializing...';
             const currentStatus = status?.status || 'pending';
             
             return (
-              <div key={task.task_id} className="border rounded-md p-4 space-y-3">
+              <div key={`${task.task_id}-${index}`} className="border rounded-md p-4 space-y-3">
                 <div className="flex justify-between items-center">
                   <div className="truncate flex-1">
                     <span className="font-medium">Target:</span> {task.url}
@@ -173,6 +232,13 @@ function TaskStatusBadge({ status }) {
           Failed
         </div>
       );
+    case 'cancelled':
+      return (
+        <div className="flex items-center rounded-full px-2.5 py-0.5 text-xs font-medium bg-gray-100 text-gray-700">
+          <Ban className="h-3 w-3 mr-1" />
+          Cancelled
+        </div>
+      );
     case 'running':
       return (
         <div className="flex items-center rounded-full px-2.5 py-0.5 text-xs font-medium bg-blue-50 text-blue-700">
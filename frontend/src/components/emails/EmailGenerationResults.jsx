@@ -40,23 +40,20 @@ useEffect(() => {
       const newResults = { ...results };
       let fetchedAny = false;
       
-      // Use Promise.all for parallel requests
-      const statusPromises = tasksToFetch.map(task => 
-        tasksApi.getStatus(task.task_id)
-          .then(status => {
-            if (status.status === 'completed' && status.result) {
-              newResults[task.task_id] = status.result;
-              fetchedAny = true;
-            }
-            return status;
-          })
-          .catch(err => {
-            console.error(`Error fetching results for task ${task.task_id}:`, err);
-            return null;
-          })
-      );
-      
-      await Promise.all(statusPromises);
+      // Fetch all pending results in a single request
+      try {
+        const response = await tasksApi.getStatuses({
+          taskIds: tasksToFetch.map(task => task.task_id),
+        });
+        for (const [taskId, status] of Object.entries(response.tasks)) {
+          if (status.status === 'completed' && status.result) {
+            newResults[taskId] = status.result;
+            fetchedAny = true;
+          }
+        }
+      } catch (err) {
+        console.error("Error fetching results:", err);
+      }
       
       if (fetchedAny) {
         setResults(newResults);
@@ -30,6 +30,7 @@ export function EnhancedEmailGenerator() {
   const [isGenerating, setIsGenerating] = useState(false);
   const [error, setError] = useState('');
   const [tasks, setTasks] = useState([]);
+  const [batchId, setBatchId] = useState(null);
   const [showResults, setShowResults] = useState(false);
   
   const [formData, setFormData] = useState({
@@ -113,6 +114,7 @@ export function EnhancedEmailGenerator() {
       });
       
       setTasks(response.tasks);
+      setBatchId(response.batch_id);
       setShowResults(true);
     } catch (err) {
       setError(err.message || 'Failed to start email generation. Please try again.');
@@ -157,7 +159,7 @@ export function EnhancedEmailGenerator() {
       
       {showResults ? (
         <div className="space-y-8">
-          <EmailGenerationProgress tasks={tasks} />
+          <EmailGenerationProgress tasks={tasks} batchId={batchId} />
           <EmailGenerationResults 
             tasks={tasks} 
             companyId={company.id} 
@@ -18,6 +18,47 @@ export const tasks = {
     return fetchAPI(`/tasks/status/${taskId}`);
   },
   
+  // Fetch many task statuses at once. With sinceVersion, only tasks that
+  // changed after that version are returned.
+  getStatuses: async ({ taskIds = [], batchId = null, sinceVersion = 0 }) => {
+    return fetchAPI("/tasks/status", {
+      method: "POST",
+      body: JSON.stringify({
+        task_ids: taskIds,
+        batch_id: batchId,
+        since_version: sinceVersion,
+      }),
+    });
+  },
+  
+  // URL of the Server-Sent Events stream for task progress. EventSource
+  // cannot send headers, so the token goes in the query string.
+  eventsUrl: ({ taskIds = [], batchId = null }) => {
+    const params = new URLSearchParams();
+    if (taskIds.length > 0) params.set("task_ids", taskIds.join(","));
+    if (batchId) params.set("batch_id", batchId);
+    params.set("token", localStorage.getItem("token") || "");
+    return `${API_URL}/tasks/events?${params.toString()}`;
+  },
+  
+  getBatches: async (limit = 50) => {
+    return fetchAPI(`/tasks/batches?limit=${limit}`);
+  },
+  
+  // Counts by state, aggregate progress and per-URL statuses of a batch
+  getBatch: async (batchId, { includeResults = false } = {}) => {
+    return fetchAPI(`/tasks/batches/${batchId}?include_results=${includeResults}`);
+  },
+  
+  cancelTask: async (taskId) => {
+    return fetchAPI(`/tasks/cancel/${taskId}`, { method: "POST" });
+  },
+  
+  // Cancel every unfinished task of a batch
+  cancelBatch: async (batchId) => {
+    return fetchAPI(`/tasks/batches/${batchId}/cancel`, { method: "POST" });
+  },
+  
   saveEmail: async (data) => {
     return fetchAPI("/tasks/save-email", {
       method: "POST",